@@ -0,0 +1,218 @@
+"""
+Picks the fastest engine of a solver for the size of its input. The
+crossover sizes are DEFAULT_THRESHOLDS unless they have been measured on
+this machine with `python autotune.py`, which stores them as JSON in
+$FOOBAR_THRESHOLDS, or ~/.cache/foobar/thresholds.json by default:
+
+    {"running_with_bunnies": [[5, "permutations"], [null, "held_karp"]]}
+
+Each solver has a list of (largest input size, engine) ranges in increasing
+order, and the last range has no upper bound. The solutions with more than
+one engine take engine=None to pick one here, or the name of an engine to
+force it.
+
+    python autotune.py                  # (re)calibrate every solver
+    python autotune.py doomsday_fuel    # just one
+    python autotune.py --show           # print the stored thresholds
+
+Importing this module imports none of the solver modules.
+"""
+import importlib
+import json
+import os
+import sys
+import timeit
+
+
+def grid_cells(g):
+    return len(g) * len(g[0])
+
+
+# solver: (candidate engines, calibration sizes, benchmark input generator, size of the solver's first argument)
+CANDIDATE_ENGINES = {
+    'running_with_bunnies': (('permutations', 'held_karp'), [1, 2, 3, 4, 5, 6, 7, 8], 'hallway_input', len),
+    'doomsday_fuel': (('fractions', 'fraction_free'), [2, 4, 8, 16, 32], 'absorbing_chain_input', len),
+    'expanding_nebula': (('backtracking', 'in_place', 'columns'), [2, 4, 8, 16, 32], 'nebula_input', grid_cells),
+    'distract_the_trainers': (('edmonds', 'phases', 'dense'), [4, 16, 64, 256, 1024, 4096], 'banana_input', len),
+}
+
+# the ranges used for solvers that haven't been calibrated on this machine
+DEFAULT_THRESHOLDS = {
+    'running_with_bunnies': [[7, 'permutations'], [None, 'held_karp']],
+    'doomsday_fuel': [[None, 'fraction_free']],
+    'expanding_nebula': [[36, 'columns'], [None, 'in_place']],
+    'distract_the_trainers': [[None, 'dense']],
+}
+
+
+def thresholds_path():
+    return os.environ.get('FOOBAR_THRESHOLDS') or os.path.join(
+        os.path.expanduser('~'), '.cache', 'foobar', 'thresholds.json')
+
+
+def load_thresholds(path=None):
+    """
+    the stored thresholds of every calibrated solver, or {} if there are none
+    (or the file can't be read)
+    """
+    try:
+        with open(path or thresholds_path()) as thresholds_file:
+            thresholds = json.load(thresholds_file)
+    except (OSError, ValueError):
+        return dict()
+
+    return thresholds if isinstance(thresholds, dict) else dict()
+
+
+def save_thresholds(thresholds, path=None):
+    """
+    writes thresholds to path through a temporary file, so processes
+    calibrating at the same time never see a half-written file
+    """
+    path = path or thresholds_path()
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    temporary_path = '{}.{:d}.tmp'.format(path, os.getpid())
+    with open(temporary_path, 'w') as thresholds_file:
+        json.dump(thresholds, thresholds_file, indent=2, sort_keys=True)
+    os.replace(temporary_path, path)
+
+
+def threshold_ranges(winners):
+    """
+    Merges the fastest engine at each calibration size into (largest size,
+    engine) ranges, one per engine. Near a crossover the timings are close
+    enough for the winner to flip back and forth, so when an engine wins
+    again after losing, the ranges in between are merged into its range.
+
+    >>> threshold_ranges([(1, 'a'), (2, 'a'), (4, 'b'), (8, 'c'), (16, 'c')])
+    [[2, 'a'], [4, 'b'], [None, 'c']]
+    >>> threshold_ranges([(5, 'a'), (6, 'b'), (7, 'a'), (8, 'b'), (9, 'b')])
+    [[7, 'a'], [None, 'b']]
+    """
+    ranges = []
+    for size, engine in winners:
+        earlier_ranges = [index for index, (_, range_engine) in enumerate(ranges) if range_engine == engine]
+        if earlier_ranges:
+            del ranges[earlier_ranges[0] + 1:]
+            ranges[-1][0] = size
+        else:
+            ranges.append([size, engine])
+
+    ranges[-1][0] = None
+    return ranges
+
+
+def calibrate(solver, repeat=3, drop_factor=4.0, seed=0, log=None):
+    """
+    Times every candidate engine of solver on the benchmark inputs of each of
+    its calibration sizes and returns the ranges of sizes each engine was the
+    fastest for. An engine more than drop_factor times slower than the
+    fastest one at some size isn't timed at the larger sizes.
+    """
+    import benchmark
+
+    engines, sizes, generator_name, input_size = CANDIDATE_ENGINES[solver]
+    solution = importlib.import_module(solver).solution
+    generator = getattr(benchmark, generator_name)
+
+    remaining_engines = list(engines)
+    winners = []
+    for size in sizes:
+        seconds = dict()
+        for engine in remaining_engines:
+            seconds[engine] = float('inf')
+            for _ in range(repeat):
+                # a fresh input for every run, since some solvers modify theirs
+                args = generator(size, seed)
+                start = timeit.default_timer()
+                solution(*args, engine=engine)
+                seconds[engine] = min(seconds[engine], timeit.default_timer() - start)
+
+        fastest = min(remaining_engines, key=seconds.get)
+        winners.append((input_size(generator(size, seed)[0]), fastest))
+        remaining_engines = [engine for engine in remaining_engines
+                             if seconds[engine] <= drop_factor * seconds[fastest]]
+
+        if log is not None:
+            print('{:<24}{:>6}  {}'.format(solver, size, '  '.join(
+                '{}={:.6f}'.format(engine, seconds[engine]) for engine in seconds)), file=log)
+
+    return threshold_ranges(winners)
+
+
+# the thresholds stored by the last calibration, loaded on first use
+loaded_thresholds = None
+
+
+def solver_thresholds(solver):
+    """
+    the threshold ranges of solver: the stored ones if it has been calibrated
+    (with the current candidate engines), otherwise DEFAULT_THRESHOLDS
+    """
+    global loaded_thresholds
+
+    if loaded_thresholds is None:
+        loaded_thresholds = load_thresholds()
+
+    ranges = loaded_thresholds.get(solver)
+    if not ranges or any(engine not in CANDIDATE_ENGINES[solver][0] for _, engine in ranges):
+        # never calibrated, or calibrated when it had other engines
+        return DEFAULT_THRESHOLDS[solver]
+
+    return ranges
+
+
+def choose_engine(solver, solver_input, thresholds=None):
+    """
+    The engine to use for solver given its (first) argument solver_input,
+    according to thresholds (solver_thresholds by default).
+
+    >>> thresholds = {'running_with_bunnies': [[5, 'permutations'], [None, 'held_karp']]}
+    >>> choose_engine('running_with_bunnies', [[0] * 5] * 5, thresholds)
+    'permutations'
+    >>> choose_engine('running_with_bunnies', [[0] * 9] * 9, thresholds)
+    'held_karp'
+    """
+    ranges = thresholds[solver] if thresholds is not None else solver_thresholds(solver)
+    size = CANDIDATE_ENGINES[solver][3](solver_input)
+
+    for largest_size, engine in ranges:
+        if largest_size is None or size <= largest_size:
+            return engine
+
+    return ranges[-1][1]
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Measure the crossover sizes between the engines of each solver.')
+    parser.add_argument('solvers', nargs='*', metavar='solver',
+                        help='solvers to calibrate (default: all of {})'.format(', '.join(CANDIDATE_ENGINES)))
+    parser.add_argument('--repeat', type=int, default=3, help='runs per engine and size (the best one counts)')
+    parser.add_argument('--show', action='store_true', help='print the stored thresholds instead of calibrating')
+    args = parser.parse_args(argv)
+
+    unknown = [solver for solver in args.solvers if solver not in CANDIDATE_ENGINES]
+    if unknown:
+        parser.error('unknown solver: ' + ', '.join(unknown))
+
+    if args.show:
+        json.dump(load_thresholds(), sys.stdout, indent=2, sort_keys=True)
+        print()
+        return 0
+
+    thresholds = load_thresholds()
+    for solver in args.solvers or CANDIDATE_ENGINES:
+        thresholds[solver] = calibrate(solver, args.repeat, log=sys.stderr)
+        save_thresholds(thresholds)
+
+    print('thresholds written to ' + thresholds_path(), file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,266 @@
+"""
+Runs newline-delimited JSON jobs through the solvers registry on a pool of
+worker processes, writing one JSON result line per job as jobs complete:
+
+    {"id": 7, "solver": "doomsday_fuel", "input": [[0, 1], [0, 0]]}
+    {"id": 8, "solver": "bomb_baby", "args": ["4", "7"]}
+    {"id": 9, "solver": "distract_the_trainers", "input": [1, 7, 3], "options": {"engine": "dense"}}
+
+"input" is the solver's only argument, "args" its list of positional
+arguments and "options" its keyword arguments; jobs without an "id" get
+their line number. Results look like {"id": 7, "result": [0, 1, 1]} or
+{"id": 7, "error": "..."}.
+
+    python batch_runner.py jobs.jsonl --workers 8 --timeout 10 > results.jsonl
+
+Jobs are read only as fast as the pool works through them (at most
+max_pending batches are in flight), so memory stays bounded however long the
+input is. Small jobs for the same solver are sent to the workers in batches.
+"""
+import concurrent.futures
+import concurrent.futures.process
+import functools
+import json
+import os
+import signal
+import sys
+
+import result_cache
+import solvers
+
+
+class JobTimeout(Exception):
+    pass
+
+
+def raise_job_timeout(signum, frame):
+    raise JobTimeout()
+
+
+def run_job(job, timeout=None, cache_path=None):
+    """
+    The result line (as a dict) of a single job, run in this process. If
+    timeout is given the job is interrupted with SIGALRM after that many
+    seconds (where the platform has setitimer). If cache_path is given,
+    results are looked up in and added to the ResultCache at that path.
+
+    >>> run_job({'id': 1, 'solver': 'bomb_baby', 'args': ['4', '7']})
+    {'id': 1, 'result': '4'}
+    >>> run_job({'id': 2, 'solver': 'doomsday_fuel', 'input': [[0, 1], [0, 0]], 'options': {'engine': 'fractions'}})
+    {'id': 2, 'result': [1, 1]}
+    >>> run_job({'id': 3, 'solver': 'gold_mining', 'input': 1})
+    {'id': 3, 'error': 'KeyError: "unknown solver \\'gold_mining\\'"'}
+    >>> run_job({'id': 4, 'solver': 'running_with_bunnies', 'args': [[[1] * 12 for _ in range(12)], 0],
+    ...          'options': {'engine': 'permutations'}}, timeout=0.01)
+    {'id': 4, 'error': 'timed out after 0.01 s'}
+    """
+    job_id = job.get('id')
+
+    if 'parse_error' in job:
+        return {'id': job_id, 'error': job['parse_error']}
+
+    use_timer = timeout and hasattr(signal, 'setitimer')
+
+    try:
+        if cache_path:
+            solver = functools.partial(result_cache.open_cache(cache_path).solve, job.get('solver'))
+        else:
+            solver = solvers.get_solver(job.get('solver'))
+        args = job['args'] if 'args' in job else [job.get('input')]
+
+        if use_timer:
+            previous_handler = signal.signal(signal.SIGALRM, raise_job_timeout)
+            signal.setitimer(signal.ITIMER_REAL, timeout)
+        try:
+            result = solver(*args, **job.get('options', {}))
+            # cancel the timer as soon as the solver returns, so a late alarm can't discard its result
+            if use_timer:
+                signal.setitimer(signal.ITIMER_REAL, 0)
+        finally:
+            if use_timer:
+                signal.setitimer(signal.ITIMER_REAL, 0)
+                signal.signal(signal.SIGALRM, previous_handler)
+
+        return {'id': job_id, 'result': solvers.json_result(result)}
+    except JobTimeout:
+        return {'id': job_id, 'error': 'timed out after {} s'.format(timeout)}
+    except Exception as error:
+        return {'id': job_id, 'error': '{}: {}'.format(type(error).__name__, error)}
+
+
+def run_batch(jobs, timeout=None, cache_path=None):
+    return [run_job(job, timeout, cache_path) for job in jobs]
+
+
+def read_jobs(lines):
+    """
+    (job, size in bytes) for each non-blank line; lines that aren't JSON
+    objects become jobs that only report the problem
+
+    >>> list(read_jobs(['{"solver": "bomb_baby", "args": ["4", "7"]}', '', '[1]']))
+    [({'solver': 'bomb_baby', 'args': ['4', '7'], 'id': 1}, 43), ({'id': 3, 'parse_error': 'expected a JSON object'}, 3)]
+    """
+    for line_number, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+
+        try:
+            job = json.loads(line)
+        except ValueError as error:
+            job = {'id': line_number, 'parse_error': 'invalid JSON: {}'.format(error)}
+        else:
+            if not isinstance(job, dict):
+                job = {'id': line_number, 'parse_error': 'expected a JSON object'}
+            else:
+                job.setdefault('id', line_number)
+
+        yield job, len(line.encode('utf-8'))
+
+
+def job_batches(sized_jobs, batch_size=32, small_job_size=4096):
+    """
+    Groups small jobs (input lines of at most small_job_size bytes) by solver
+    into batches of up to batch_size, and yields every larger job as a batch
+    of its own. Open batches are all flushed once they hold 4 * batch_size
+    jobs between them, so jobs for a rarely used solver aren't held back
+    for long.
+
+    >>> jobs = [({'id': i, 'solver': 'ab'[i % 2]}, 10) for i in range(5)] + [({'id': 5, 'solver': 'a'}, 5000)]
+    >>> [[job['id'] for job in batch] for batch in job_batches(jobs, batch_size=2)]
+    [[0, 2], [1, 3], [5], [4]]
+    """
+    open_batches = dict()
+    held_jobs = 0
+
+    for job, size in sized_jobs:
+        if size > small_job_size:
+            yield [job]
+            continue
+
+        solver = job.get('solver')
+        batch = open_batches.setdefault(solver, [])
+        batch.append(job)
+        held_jobs += 1
+
+        if len(batch) >= batch_size:
+            held_jobs -= len(batch)
+            yield open_batches.pop(solver)
+        elif held_jobs >= 4 * batch_size:
+            for batch in open_batches.values():
+                yield batch
+            open_batches.clear()
+            held_jobs = 0
+
+    for batch in open_batches.values():
+        yield batch
+
+
+def run_jobs(sized_jobs, workers=None, timeout=None, batch_size=32, small_job_size=4096, max_pending=None,
+             cache_path=None):
+    """
+    Yields the result of every job, in the order the batches complete. At
+    most max_pending batches (twice the number of workers by default) are
+    submitted but not yet collected; no more input is read until one of them
+    completes. With workers=0 the jobs run in this process, in order.
+
+    >>> jobs = read_jobs(['{"solver": "fuel_injection_perfection", "input": "%d"}' % n for n in (15, 4, 7)])
+    >>> sorted((result['id'], result['result']) for result in run_jobs(jobs, workers=2, batch_size=2))
+    [(1, 5), (2, 2), (3, 4)]
+
+    A worker that dies (e.g. killed for running out of memory) breaks the
+    whole pool. Every batch in flight then gets an error line, and the
+    batches not yet submitted go to a new pool:
+
+    >>> import multiprocessing
+    >>> jobs = read_jobs(['{"solver": "fuel_injection_perfection", "input": "%d"}' % n for n in (15, 4, 7, 9)])
+    >>> results = run_jobs(jobs, workers=1, batch_size=1, max_pending=1)
+    >>> next(results)
+    {'id': 1, 'result': 5}
+    >>> for worker in multiprocessing.active_children():
+    ...     worker.kill()
+    >>> results = {result['id']: result for result in results}
+    >>> sorted(results), results[3], results[4]
+    ([2, 3, 4], {'id': 3, 'result': 4}, {'id': 4, 'result': 4})
+    """
+    batches = job_batches(sized_jobs, batch_size, small_job_size)
+
+    if workers == 0:
+        for batch in batches:
+            for result in run_batch(batch, timeout, cache_path):
+                yield result
+        return
+
+    workers = workers or os.cpu_count() or 1
+    max_pending = max_pending or 2 * workers
+    pending = dict()
+
+    def collect(futures):
+        for future in futures:
+            batch = pending.pop(future)
+            try:
+                results = future.result()
+            except Exception as error:
+                # the worker died, or the pool broke while the batch was waiting for one
+                results = [{'id': job.get('id'), 'error': '{}: {}'.format(type(error).__name__, error)}
+                           for job in batch]
+            for result in results:
+                yield result
+
+    executor = concurrent.futures.ProcessPoolExecutor(max_workers=workers)
+    try:
+        for batch in batches:
+            if len(pending) >= max_pending:
+                done, _ = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+            else:
+                done = [future for future in pending if future.done()]
+            for result in collect(done):
+                yield result
+
+            try:
+                future = executor.submit(run_batch, batch, timeout, cache_path)
+            except concurrent.futures.process.BrokenProcessPool:
+                # a worker died and took the pool with it: report the batches that
+                # were in flight, and carry on with the rest on a new pool
+                for result in collect(list(pending)):
+                    yield result
+                executor.shutdown()
+                executor = concurrent.futures.ProcessPoolExecutor(max_workers=workers)
+                future = executor.submit(run_batch, batch, timeout, cache_path)
+
+            pending[future] = batch
+
+        for result in collect(concurrent.futures.as_completed(list(pending))):
+            yield result
+    finally:
+        executor.shutdown()
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Run JSON-lines solver jobs on a process pool.')
+    parser.add_argument('jobs', nargs='?', default='-', help='file of JSON jobs, one per line (default: stdin)')
+    parser.add_argument('--workers', type=int, help='worker processes (default: one per CPU; 0 runs jobs inline)')
+    parser.add_argument('--timeout', type=float, help='seconds before a job is abandoned')
+    parser.add_argument('--batch-size', type=int, default=32, help='small jobs per batch sent to a worker')
+    parser.add_argument('--small-job-size', type=int, default=4096,
+                        help='jobs with longer input lines than this many bytes are sent on their own')
+    parser.add_argument('--max-pending', type=int, help='batches in flight (default: twice the workers)')
+    parser.add_argument('--cache', help='answer repeated inputs from (and store results in) this result cache file')
+    args = parser.parse_args(argv)
+
+    source = sys.stdin if args.jobs == '-' else open(args.jobs)
+    try:
+        results = run_jobs(read_jobs(source), args.workers, args.timeout, args.batch_size,
+                           args.small_job_size, args.max_pending, args.cache)
+        for result in results:
+            sys.stdout.write(json.dumps(result) + '\n')
+    finally:
+        if source is not sys.stdin:
+            source.close()
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
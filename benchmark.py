@@ -0,0 +1,316 @@
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import timeit
+import tracemalloc
+
+import bomb_baby
+import distract_the_trainers
+import doomsday_fuel
+import expanding_nebula
+import fuel_injection_perfection
+import running_with_bunnies
+
+
+def decimal_string(n, rng):
+    """
+    a random decimal string of n digits without a leading zero
+
+    >>> len(decimal_string(50, random.Random(0))), decimal_string(1, random.Random(0)) != '0'
+    (50, True)
+    """
+    return str(rng.randint(1, 9)) + ''.join(str(rng.randint(0, 9)) for _ in range(n - 1))
+
+
+def bomb_baby_input(n, seed=0):
+    """
+    two coprime decimal strings of about n digits; coprime pairs are the
+    ones that run the Euclidean loop to the end rather than stopping early
+    with 'impossible'
+
+    >>> x, y = bomb_baby_input(30)
+    >>> bomb_baby.solution(x, y) != 'impossible'
+    True
+    """
+    rng = random.Random(seed)
+    x = decimal_string(n, rng)
+
+    while True:
+        y = decimal_string(n, rng)
+        if bomb_baby.solution(x, y) != 'impossible':
+            return x, y
+
+
+def fuel_injection_input(n, seed=0):
+    """
+    a decimal string of n digits for fuel_injection_perfection
+
+    >>> fuel_injection_input(12) == fuel_injection_input(12), len(fuel_injection_input(12)[0])
+    (True, 12)
+    """
+    return (decimal_string(n, random.Random(seed)),)
+
+
+def hallway_input(n, seed=0):
+    """
+    a running_with_bunnies hallway with n bunnies (n + 2 locations) and a time
+    limit that admits some but not all of them; times are positive, so there
+    are no negative cycles to short-circuit the search
+
+    >>> times, time_limit = hallway_input(3)
+    >>> len(times), all(times[i][i] == 0 for i in range(5))
+    (5, True)
+    """
+    rng = random.Random(seed)
+    locations = n + 2
+    times = [[0 if i == j else rng.randint(1, 9) for j in range(locations)] for i in range(locations)]
+
+    return times, 2 * locations
+
+
+def absorbing_chain_input(n, seed=0):
+    """
+    a doomsday_fuel state matrix with n states: the first half transient, each
+    with random transitions to any state, and the rest terminal. Every
+    transient state has an edge to the next state so all of them are reachable
+    from state 0.
+
+    >>> m = absorbing_chain_input(6)[0]
+    >>> [sum(row) > 0 for row in m]
+    [True, True, True, False, False, False]
+    """
+    rng = random.Random(seed)
+    transient = max(1, n // 2)
+    m = [[0] * n for _ in range(n)]
+
+    for state in range(transient):
+        for target in range(n):
+            if rng.random() < 0.5:
+                m[state][target] = rng.randint(1, 9)
+        m[state][state + 1] += 1
+
+    return (m,)
+
+
+def sparse_chain_input(n, seed=0, transitions=3):
+    """
+    a doomsday_fuel chain of n states in the sparse form of
+    approximate_solution: the first half transient, each with a few random
+    transitions plus one to the next state, and the rest terminal
+
+    >>> rows = sparse_chain_input(10)[0]
+    >>> [len(row) > 0 for row in rows] == [True] * 5 + [False] * 5
+    True
+    """
+    rng = random.Random(seed)
+    transient = max(1, n // 2)
+    rows = []
+
+    for state in range(n):
+        row = dict()
+        if state < transient:
+            for _ in range(transitions):
+                target = rng.randrange(n)
+                row[target] = row.get(target, 0) + rng.randint(1, 9)
+            row[state + 1] = row.get(state + 1, 0) + 1
+        rows.append(row)
+
+    return (rows,)
+
+
+def nebula_input(n, seed=0, height=9):
+    """
+    a random nebula grid of the given height and width n with about a third
+    of its cells set, as in the commented-out generator in expanding_nebula
+
+    >>> g = nebula_input(20)[0]
+    >>> len(g), len(g[0])
+    (9, 20)
+    """
+    rng = random.Random(seed)
+    return ([[rng.choice([True, False, False]) for _ in range(n)] for _ in range(height)],)
+
+
+def banana_input(n, seed=0):
+    """
+    a banana list of n trainers from distract_the_trainers.random_banana_list
+
+    >>> len(banana_input(40)[0])
+    40
+    """
+    return (distract_the_trainers.random_banana_list(n, seed),)
+
+
+SOLVER_MODULES = ('bomb_baby', 'distract_the_trainers', 'doomsday_fuel', 'expanding_nebula',
+                  'fuel_injection_perfection', 'message', 'running_with_bunnies')
+
+# modules the solver modules only import when a solver needs them
+DEFERRED_IMPORTS = ('numpy', 'concurrent.futures')
+
+
+def import_in_fresh_interpreter(modules):
+    """
+    Imports modules in a new interpreter, as a command line run would, and
+    returns the DEFERRED_IMPORTS that got imported along the way.
+
+    >>> import_in_fresh_interpreter(SOLVER_MODULES)
+    []
+    """
+    script = 'import sys; import {}; print(" ".join(m for m in sys.argv[1:] if m in sys.modules))'.format(
+        ', '.join(modules))
+    output = subprocess.check_output([sys.executable, '-c', script] + list(DEFERRED_IMPORTS),
+                                     cwd=os.path.dirname(os.path.abspath(__file__)), universal_newlines=True)
+    return output.split()
+
+
+def solver_modules_input(n, seed=0):
+    """
+    the first n of SOLVER_MODULES, for timing how long importing them takes
+
+    >>> solver_modules_input(2)
+    (('bomb_baby', 'distract_the_trainers'),)
+    """
+    return (SOLVER_MODULES[:n],)
+
+
+# benchmark name: (function, input generator, default size sweep)
+BENCHMARKS = {
+    'bomb_baby': (bomb_baby.solution, bomb_baby_input, [100, 1000, 4000]),
+    'fuel_injection_perfection': (fuel_injection_perfection.solution, fuel_injection_input, [100, 200, 300]),
+    'running_with_bunnies': (running_with_bunnies.solution, hallway_input, [3, 5, 7]),
+    'doomsday_fuel': (doomsday_fuel.solution, absorbing_chain_input, [6, 12, 24]),
+    'doomsday_fuel_approximate': (doomsday_fuel.approximate_solution, sparse_chain_input, [1000, 10000, 100000]),
+    'expanding_nebula': (expanding_nebula.solution, nebula_input, [10, 20, 40]),
+    'expanding_nebula_modular': (lambda g: expanding_nebula.modular_solution(g, [1000003]), nebula_input, [10, 20, 40]),
+    'expanding_nebula_log': (expanding_nebula.log_solution, nebula_input, [10, 20, 40]),
+    'distract_the_trainers': (lambda banana_list: distract_the_trainers.solution(banana_list, engine='dense'),
+                              banana_input, [1000, 10000, 100000]),
+    'solver_imports': (import_in_fresh_interpreter, solver_modules_input, [1, len(SOLVER_MODULES)]),
+}
+
+
+def measure(function, generator, size, seed=0, repeat=3):
+    """
+    Runs function on a fresh generator(size, seed) input repeat times and
+    returns the best wall time in seconds, then once more under tracemalloc
+    for the peak number of bytes allocated during the call. Inputs are built
+    outside the timed region and rebuilt for every run, since some solvers
+    (running_with_bunnies) modify their input in place.
+
+    >>> seconds, peak_bytes = measure(bomb_baby.solution, bomb_baby_input, 50, repeat=1)
+    >>> seconds > 0, peak_bytes > 0
+    (True, True)
+    """
+    best = float('inf')
+
+    for _ in range(repeat):
+        args = generator(size, seed)
+        start = timeit.default_timer()
+        function(*args)
+        best = min(best, timeit.default_timer() - start)
+
+    args = generator(size, seed)
+    tracemalloc.start()
+    try:
+        function(*args)
+        _, peak_bytes = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return best, peak_bytes
+
+
+def run_benchmarks(names=None, sizes=None, seed=0, repeat=3, log=None):
+    """
+    Measures each named benchmark (all of them by default) across its size
+    sweep, or across sizes if given, and returns a list of result dicts.
+    """
+    results = []
+
+    for name in names or BENCHMARKS:
+        function, generator, default_sizes = BENCHMARKS[name]
+
+        for size in sizes or default_sizes:
+            seconds, peak_bytes = measure(function, generator, size, seed, repeat)
+            results.append({'benchmark': name, 'size': size, 'seconds': seconds, 'peak_bytes': peak_bytes})
+
+            if log is not None:
+                print('{:<28}{:>10}{:>14.6f} s{:>14} B'.format(name, size, seconds, peak_bytes), file=log)
+
+    return results
+
+
+def find_regressions(results, baseline, tolerance=1.5, min_seconds=0.001):
+    """
+    Compares results against the results of a baseline run and returns a
+    description of every (benchmark, size) whose time or peak memory grew by
+    more than the tolerance factor. Times under min_seconds in the baseline
+    are too noisy to compare and are compared against min_seconds instead.
+
+    >>> baseline = [{'benchmark': 'b', 'size': 1, 'seconds': 0.5, 'peak_bytes': 1000}]
+    >>> find_regressions([{'benchmark': 'b', 'size': 1, 'seconds': 0.6, 'peak_bytes': 1000}], baseline)
+    []
+    >>> find_regressions([{'benchmark': 'b', 'size': 1, 'seconds': 1.0, 'peak_bytes': 1000}], baseline)
+    ['b (size 1): seconds 0.5 -> 1.0']
+    """
+    baseline_by_case = {(result['benchmark'], result['size']): result for result in baseline}
+    regressions = []
+
+    for result in results:
+        previous = baseline_by_case.get((result['benchmark'], result['size']))
+        if previous is None:
+            continue
+
+        for metric, floor in (('seconds', min_seconds), ('peak_bytes', 0)):
+            if result[metric] > max(previous[metric], floor) * tolerance:
+                regressions.append('{} (size {}): {} {} -> {}'.format(
+                    result['benchmark'], result['size'], metric, previous[metric], result[metric]))
+
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Time and peak memory of every solver across input size sweeps.')
+    parser.add_argument('benchmarks', nargs='*', metavar='benchmark',
+                        help='benchmarks to run (default: all of {})'.format(', '.join(BENCHMARKS)))
+    parser.add_argument('--sizes', type=int, nargs='+', help='override the size sweep')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--output', help='write the results as JSON to this file')
+    parser.add_argument('--baseline', help='fail if any result regressed against the results in this JSON file')
+    parser.add_argument('--tolerance', type=float, default=1.5, help='allowed slowdown factor against the baseline')
+    args = parser.parse_args(argv)
+
+    unknown = [name for name in args.benchmarks if name not in BENCHMARKS]
+    if unknown:
+        parser.error('unknown benchmark: ' + ', '.join(unknown))
+
+    results = run_benchmarks(args.benchmarks, args.sizes, args.seed, args.repeat, log=sys.stderr)
+    report = {'python': platform.python_version(), 'machine': platform.machine(), 'results': results}
+
+    if args.output:
+        with open(args.output, 'w') as output:
+            json.dump(report, output, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+    failures = ['importing the solvers imports ' + module for module in import_in_fresh_interpreter(SOLVER_MODULES)]
+
+    if args.baseline:
+        with open(args.baseline) as baseline_file:
+            failures += ['regression: ' + regression
+                         for regression in find_regressions(results, json.load(baseline_file)['results'], args.tolerance)]
+
+    for failure in failures:
+        print(failure, file=sys.stderr)
+
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
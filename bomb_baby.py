@@ -18,8 +18,8 @@ def solution(x, y):
     >>> solution(str(10 ** 51 + 33), str(10 ** 52 + 495))
     '6060606060606060606060606060606060606060606060631'
     """
-    x_as_int = long(x)
-    y_as_int = long(y)
+    x_as_int = int(x)
+    y_as_int = int(y)
 
     # Consider the process of retracing the steps back, with respect
     # to the two possible replication cycles. Let m', f' be the number
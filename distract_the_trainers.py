@@ -1,4 +1,26 @@
+import array
+import collections
+import functools
 import itertools
+import random
+import timeit
+
+import autotune
+import instrumentation
+
+
+@functools.lru_cache(maxsize=None)
+def load_numpy():
+    """
+    NumPy, or None if it is not installed. Only the vectorized graph builders
+    use it, so it is imported the first time one of them runs rather than
+    with this module.
+    """
+    try:
+        import numpy
+    except ImportError:
+        return None
+    return numpy
 
 
 class Forest:
@@ -195,6 +217,230 @@ def will_thumb_wrestle_forever(a_bananas, b_bananas):
         return (quotient + 1) & quotient != 0
 
 
+def wrestle_forever_mask(bananas, other_bananas):
+    """
+    will_thumb_wrestle_forever(bananas, b) for every b in other_bananas at once.
+    With NumPy this is a handful of array operations on 64-bit counts (an
+    overflow of quotient + 1 only happens for quotient 2^64 - 1, which is of
+    the form 2^k - 1 anyway); without it, it falls back to a list.
+
+    >>> [bool(forever) for forever in wrestle_forever_mask(11, [693, 21, 11, 77, 2 ** 63])]
+    [False, True, False, False, True]
+    """
+    numpy = load_numpy()
+    if numpy is None:
+        return [will_thumb_wrestle_forever(bananas, b_bananas) for b_bananas in other_bananas]
+
+    other_bananas = numpy.asarray(other_bananas, dtype=numpy.uint64)
+    smaller = numpy.minimum(other_bananas, numpy.uint64(bananas))
+    larger = numpy.maximum(other_bananas, numpy.uint64(bananas))
+    quotient, remainder = numpy.divmod(larger, smaller)
+
+    return (remainder != 0) | ((quotient + numpy.uint64(1)) & quotient != 0)
+
+
+def packed_wrestle_adjacency(banana_list, block_size=1024):
+    """
+    The adjacency matrix of the trainers graph as rows of packed bits (bit j
+    of row i, counting from the least significant bit of the first byte, is
+    set iff trainers i and j will thumb wrestle forever). With NumPy the rows
+    are computed block_size at a time, so the temporary arrays stay at
+    block_size * n elements; without it the rows come from SparseComplementGraph.
+
+    >>> [bytes(row) for row in packed_wrestle_adjacency([1, 21, 3, 7, 13, 19, 1, 5, 9])]\
+        == [row.to_bytes(2, 'little') for row in SparseComplementGraph([1, 21, 3, 7, 13, 19, 1, 5, 9]).adjacency_bitsets()]
+    True
+    """
+    row_bytes = (len(banana_list) + 7) // 8
+
+    numpy = load_numpy()
+    if numpy is None:
+        return [row.to_bytes(row_bytes, 'little') for row in SparseComplementGraph(banana_list).adjacency_bitsets()]
+
+    bananas = numpy.asarray(banana_list, dtype=numpy.uint64)
+    packed_rows = numpy.empty((len(banana_list), row_bytes), dtype=numpy.uint8)
+
+    for start in range(0, len(banana_list), block_size):
+        block = bananas[start:start + block_size, None]
+        smaller = numpy.minimum(block, bananas[None, :])
+        larger = numpy.maximum(block, bananas[None, :])
+        quotient, remainder = numpy.divmod(larger, smaller)
+
+        # equal counts give quotient 1, so the diagonal is clear
+        forever = (remainder != 0) | ((quotient + numpy.uint64(1)) & quotient != 0)
+        packed_rows[start:start + block_size] = numpy.packbits(forever, axis=1, bitorder='little')
+
+    return packed_rows
+
+
+class SparseComplementGraph:
+    """
+    The trainers graph is nearly complete, so this stores the sparse
+    complement instead: the pairs of trainers that will not thumb wrestle
+    forever. Trainers are grouped by banana count. Two counts a <= b stop
+    looping iff b == a * (2^k - 1) for some k >= 1, so for each distinct count
+    only the O(log(max count)) candidate partners are looked up, and the
+    complement is stored between groups rather than between trainers.
+
+    >>> graph = SparseComplementGraph([1, 7, 3, 21, 13, 19, 1])
+    >>> graph.adjacent(0, 1), graph.adjacent(0, 3), graph.adjacent(0, 6)
+    (False, True, False)
+    >>> sorted(graph.non_neighbours(0))
+    [1, 2, 6]
+    """
+    def __init__(self, banana_list):
+        self.group_of_count = {}
+        self.group_members = []
+        self.group_of = []
+        # trainers with equal counts never loop (the quotient is 2^1 - 1)
+        self.non_looping_groups = []
+        self.largest_count = 0
+
+        for bananas in banana_list:
+            self.add_trainer(bananas)
+
+    def add_trainer(self, bananas, u=None):
+        """
+        adds a trainer as vertex u (by default a new vertex at the end, but u
+        can also be a vertex freed by remove_trainer) and returns u
+
+        >>> graph = SparseComplementGraph([1, 7])
+        >>> graph.add_trainer(3), graph.adjacent(0, 2), graph.adjacent(1, 2)
+        (2, False, True)
+        """
+        if bananas not in self.group_of_count:
+            group = self.group_of_count[bananas] = len(self.group_members)
+            self.group_members.append([])
+            self.non_looping_groups.append({group})
+            self.largest_count = max(self.largest_count, bananas)
+
+            k = 2
+            while bananas * (2 ** k - 1) <= self.largest_count or 2 ** k - 1 <= bananas:
+                for partner_count in (bananas * (2 ** k - 1), bananas // (2 ** k - 1)):
+                    partner_group = self.group_of_count.get(partner_count)
+                    if partner_group is not None and partner_count != bananas and \
+                            not will_thumb_wrestle_forever(bananas, partner_count):
+                        self.non_looping_groups[group].add(partner_group)
+                        self.non_looping_groups[partner_group].add(group)
+                k += 1
+
+        group = self.group_of_count[bananas]
+        if u is None:
+            u = len(self.group_of)
+            self.group_of.append(group)
+        else:
+            self.group_of[u] = group
+        self.group_members[group].append(u)
+
+        return u
+
+    def remove_trainer(self, u):
+        """
+        removes the trainer at vertex u, leaving u free to be reused by add_trainer
+        """
+        self.group_members[self.group_of[u]].remove(u)
+        self.group_of[u] = None
+
+    def trainers(self):
+        """
+        the vertices that hold a trainer (all of them unless some were removed)
+        """
+        return [u for u, group in enumerate(self.group_of) if group is not None]
+
+    def __len__(self):
+        return len(self.group_of)
+
+    def adjacent(self, u, v):
+        return u != v and self.group_of[v] not in self.non_looping_groups[self.group_of[u]]
+
+    def non_neighbours(self, u):
+        """
+        the trainers (other than u) that u will not thumb wrestle forever with
+        """
+        for group in self.non_looping_groups[self.group_of[u]]:
+            for v in self.group_members[group]:
+                if v != u:
+                    yield v
+
+    def complement_degree(self, u):
+        """
+        >>> SparseComplementGraph([1, 1, 3, 5]).complement_degree(0)
+        2
+        """
+        return sum(len(self.group_members[group]) for group in self.non_looping_groups[self.group_of[u]]) - 1
+
+    def neighbours(self, u):
+        non_looping_groups = self.non_looping_groups[self.group_of[u]]
+        return [v for v in range(len(self.group_of))
+                if v != u and self.group_of[v] not in non_looping_groups]
+
+    def __getitem__(self, u):
+        # lets the graph stand in for adjacency lists, e.g. in augment_from_vertex
+        return self.neighbours(u)
+
+    def adjacency_lists(self):
+        return [self.neighbours(u) for u in range(len(self.group_of))]
+
+    def connected_components(self):
+        """
+        The components of the trainers graph, found by a breadth first search
+        that never looks at the (dense) edges: the unvisited neighbours of a
+        trainer are all the unvisited trainers except its few non-neighbours.
+        Each trainer is either removed from the unvisited set or skipped as a
+        non-neighbour, so this takes O(n + complement edges).
+
+        >>> SparseComplementGraph([21, 1, 1, 7, 3, 3, 1, 1]).connected_components()
+        [[0, 1, 2, 6, 7], [3, 4, 5]]
+        """
+        unvisited = set(range(len(self.group_of)))
+        components = []
+
+        for start in range(len(self.group_of)):
+            if start not in unvisited:
+                continue
+
+            unvisited.discard(start)
+            component = [start]
+            for u in component:
+                non_neighbours = set(self.non_neighbours(u))
+                new_neighbours = [v for v in unvisited if v not in non_neighbours]
+                unvisited.difference_update(new_neighbours)
+                component += new_neighbours
+
+            components.append(component)
+
+        return components
+
+    def adjacency_bitsets(self):
+        """
+        the graph as a list of ints, where bit v of row u is set iff u and v are adjacent
+
+        >>> SparseComplementGraph([1, 7, 21]).adjacency_bitsets()
+        [4, 0, 1]
+        """
+        group_bitsets = [sum(1 << v for v in members) for members in self.group_members]
+        all_trainers = (1 << len(self.group_of)) - 1
+
+        rows = []
+        for u in range(len(self.group_of)):
+            non_neighbours = 0
+            for group in self.non_looping_groups[self.group_of[u]]:
+                non_neighbours |= group_bitsets[group]
+            rows.append(all_trainers & ~non_neighbours)
+
+        return rows
+
+
+def count_matching_event(name, amount=1):
+    """
+    adds amount to the instrumentation counter distract_the_trainers.<name>
+    (augmentations, blossom_contractions, ...) if instrumentation is on
+    """
+    stats = instrumentation.active()
+    if stats is not None:
+        stats.count('distract_the_trainers.' + name, amount)
+
+
 def contract_blossom(B, G, M):
     """
     >>> G1 = [\
@@ -469,6 +715,7 @@ def find_augmenting_path(G, M):
                         return F.path(v_root, v) + F.path(w, w_root)
                     else:
                         # contract a blossom in the graph and recurse
+                        count_matching_event('blossom_contractions')
                         B = F.path(v, w)
                         Gp, Mp = contract_blossom(B, G, M)
                         Pp = find_augmenting_path(Gp, Mp)
@@ -520,6 +767,7 @@ def find_maximum_matching(G):
         if len(P) == 0:
             return M
         else:
+            count_matching_event('augmentations')
             M_augmented_along_P = augment_matching(M, P)
             return blossom_algorithm(G, M_augmented_along_P)
 
@@ -527,25 +775,990 @@ def find_maximum_matching(G):
     return blossom_algorithm(G, initial_matching)
 
 
-def solution(banana_list):
+def lowest_set_bit(bitset):
+    """
+    >>> lowest_set_bit(0b101000)
+    3
+    """
+    return (bitset & -bitset).bit_length() - 1
+
+
+def adjacency_matrix_to_bitsets(G):
+    """
+    >>> adjacency_matrix_to_bitsets([[0, 1, 1], [1, 0, 0], [1, 0, 0]])
+    [6, 1, 1]
+    """
+    return [sum(1 << v for v, adjacent in enumerate(row) if adjacent) for row in G]
+
+
+def contract_blossom_bitset(B, rows, M):
+    """
+    contract_blossom for a graph given as adjacency bitsets: the supervertex
+    takes the union of the rows of the blossom, and every other row only
+    needs one mask test to be redirected to the supervertex
+
+    >>> G1 = [\
+        [0, 1, 0, 0, 0, 0, 0, 0, 0],\
+        [1, 0, 1, 0, 0, 0, 0, 0, 0],\
+        [0, 1, 0, 1, 0, 0, 0, 0, 0],\
+        [0, 0, 1, 0, 1, 0, 0, 0, 0],\
+        [0, 0, 0, 1, 0, 1, 0, 0, 1],\
+        [0, 0, 0, 0, 1, 0, 1, 0, 0],\
+        [0, 0, 0, 0, 0, 1, 0, 1, 0],\
+        [0, 0, 0, 0, 0, 0, 1, 0, 1],\
+        [0, 0, 0, 0, 1, 0, 0, 1, 0],\
+    ]
+    >>> B1 = [4, 5, 6, 7, 8]
+    >>> M1 = {1: 2, 2: 1, 3: 4, 4: 3, 5: 6, 6: 5, 7: 8, 8: 7}
+    >>> Gp1, Mp1 = contract_blossom(B1, G1, M1)
+    >>> contract_blossom_bitset(B1, adjacency_matrix_to_bitsets(G1), M1) ==\
+            (adjacency_matrix_to_bitsets(Gp1), Mp1)
+    True
+    """
+    supervertex = B[0]
+    non_supervertices = B[1:]
+    supervertex_bit = 1 << supervertex
+    non_supervertices_mask = sum(1 << v for v in non_supervertices)
+
+    blossom_neighbours = rows[supervertex]
+    for non_supervertex in non_supervertices:
+        blossom_neighbours |= rows[non_supervertex]
+
+    Gp = []
+    for u, row in enumerate(rows):
+        if u == supervertex:
+            Gp.append(blossom_neighbours & ~non_supervertices_mask & ~supervertex_bit)
+        elif non_supervertices_mask >> u & 1:
+            Gp.append(0)
+        elif row & non_supervertices_mask:
+            Gp.append(row & ~non_supervertices_mask | supervertex_bit)
+        else:
+            Gp.append(row)
+
+    Mp = {u: M[u] for u in M if u not in non_supervertices and M[u] not in non_supervertices}
+
+    return Gp, Mp
+
+
+def lift_augmenting_path_bitset(Pp, B, rows):
+    """
+    lift_augmenting_path for find_augmenting_path_bitset, where the blossom B
+    is listed around the cycle starting from its base B[0]. Since Pp starts at
+    an exposed vertex, the supervertex is entered along a matched edge (at the
+    base) iff it is at an even position in Pp; the unmatched edge on its other
+    side meets the blossom at some B[i], and exactly one of the two ways round
+    from B[0] to B[i] has even length.
+
+    >>> rows = adjacency_matrix_to_bitsets([\
+        [0, 1, 1, 0],\
+        [1, 0, 1, 0],\
+        [1, 1, 0, 1],\
+        [0, 0, 1, 0]])
+    >>> lift_augmenting_path_bitset([0, 3], [0, 1, 2], rows)
+    [0, 1, 2, 3]
+    >>> lift_augmenting_path_bitset([3, 0], [0, 1, 2], rows)
+    [3, 2, 1, 0]
+    """
+    if B[0] not in Pp:
+        return Pp
+
+    blossom_index_in_Pp = Pp.index(B[0])
+    enters_at_base = blossom_index_in_Pp % 2 == 0
+
+    outside_vertex = Pp[blossom_index_in_Pp + 1] if enters_at_base else Pp[blossom_index_in_Pp - 1]
+    i = next(i for i, b in enumerate(B) if rows[b] >> outside_vertex & 1)
+
+    if i % 2 == 0:
+        path_through_blossom = B[:i + 1]
+    else:
+        path_through_blossom = B[:1] + B[:i - 1:-1]
+
+    if not enters_at_base:
+        path_through_blossom = path_through_blossom[::-1]
+
+    return Pp[:blossom_index_in_Pp] + path_through_blossom + Pp[blossom_index_in_Pp + 1:]
+
+
+def find_augmenting_path_bitset(rows, M):
+    """
+    find_augmenting_path for a graph given as adjacency bitsets. The unmarked
+    edges, the vertices in the forest, the even vertices and the unmarked
+    vertices are all bitsets, so choosing the next vertex or edge to look at
+    is a lowest-set-bit operation, and the forest keeps parent, root and depth
+    arrays instead of searching for parents.
+
+    >>> G2 = [[0 for _ in range(20)] for _ in range(20)]
+    >>> for (u, v) in [(0, 1), (1, 2), (2, 3), (3, 4), (4, 5),\
+               (5, 6), (4, 7), (7, 8), (4, 9), (9, 10),\
+               (10, 11), (11, 12), (12, 13), (13, 14), (12, 15),\
+               (15, 16), (11, 17), (17, 18), (18, 19), (19, 12)]:\
+            G2[u][v], G2[v][u] = 1, 1
+
+    >>> M2 = {0: 1, 1: 0, 3: 4, 4: 3, 5: 6, 6: 5, 7: 8, 8: 7, 9: 10, 10: 9,\
+      11: 17, 17: 11, 18: 19, 19: 18, 12: 13, 13: 12, 15: 16, 16: 15}
+    >>> find_augmenting_path_bitset(adjacency_matrix_to_bitsets(G2), M2)
+    [2, 3, 4, 9, 10, 11, 17, 18, 19, 12, 13, 14]
+    """
+    n = len(rows)
+    parent, root, depth = [None] * n, [None] * n, [0] * n
+
+    def path_to_root(v):
+        path = [v]
+        while parent[path[-1]] is not None:
+            path.append(parent[path[-1]])
+        return path
+
+    # unmark all vertices and edges, then mark the edges in the matching
+    unmarked_vertices = (1 << n) - 1
+    unmarked_edges = list(rows)
+    for (v, w) in M.items():
+        unmarked_edges[v] &= ~(1 << w)
+
+    # for each exposed vertex v, create a singleton tree {v}
+    in_forest = 0
+    for v in range(n):
+        if v not in M:
+            root[v] = v
+            in_forest |= 1 << v
+    even = in_forest
+
+    while True:
+        # an unmarked vertex v in the forest with distance(v, root(v)) even
+        candidates = even & unmarked_vertices
+        if candidates == 0:
+            break
+        v = lowest_set_bit(candidates)
+
+        while unmarked_edges[v]:
+            w = lowest_set_bit(unmarked_edges[v])
+
+            if not in_forest >> w & 1:
+                # w is matched, so add e and w's matched edge to the forest
+                x = M[w]
+                parent[w], root[w], depth[w] = v, root[v], depth[v] + 1
+                parent[x], root[x], depth[x] = w, root[v], depth[v] + 2
+                in_forest |= (1 << w) | (1 << x)
+                even |= 1 << x
+            elif even >> w & 1:
+                if root[v] != root[w]:
+                    # augmenting path from root of v to v, then to w and up to w's root
+                    return path_to_root(v)[::-1] + path_to_root(w)
+                else:
+                    # contract the blossom (the cycle through v, w and their common
+                    # ancestor, which is the base of the blossom) and recurse
+                    v_path, w_path = path_to_root(v), path_to_root(w)
+                    while len(v_path) > 1 and len(w_path) > 1 and v_path[-2] == w_path[-2]:
+                        v_path.pop()
+                        w_path.pop()
+                    B = v_path[-1:] + w_path[-2::-1] + v_path[:-1]
+                    count_matching_event('blossom_contractions')
+
+                    Gp, Mp = contract_blossom_bitset(B, rows, M)
+                    Pp = find_augmenting_path_bitset(Gp, Mp)
+                    return lift_augmenting_path_bitset(Pp, B, rows)
+
+            # mark e = { v, w }
+            unmarked_edges[v] &= ~(1 << w)
+            unmarked_edges[w] &= ~(1 << v)
+
+        # mark v
+        unmarked_vertices &= ~(1 << v)
+
+    return []
+
+
+def find_maximum_matching_bitset(rows):
+    """
+    find_maximum_matching for a graph given as adjacency bitsets, returning
+    the same kind of dictionary M
+
+    >>> find_maximum_matching_bitset([0b0110, 0b0101, 0b1011, 0b0100]) == {0: 1, 1: 0, 2: 3, 3: 2}
+    True
+    """
+    M = dict()
+    while True:
+        P = find_augmenting_path_bitset(rows, M)
+        if len(P) == 0:
+            return M
+        count_matching_event('augmentations')
+        M = augment_matching(M, P)
+
+
+class BlossomForest:
+    """
+    The parent pointers of alternating trees grown over the matching mate,
+    with blossoms tracked without contracting them: parent pointers are
+    rewritten to run around each blossom, and the base of the blossom a
+    vertex belongs to is kept in a union-find structure (the root of each set
+    is the base of its blossom). Shared by augment_from_vertex and
+    augmenting_phase.
+    """
+    def __init__(self, mate):
+        n = len(mate)
+        self.mate = mate
+        self.parent = [-1] * n
+        self.base = list(range(n))
+        self.ancestor_stamps = [-1] * n
+        self.blossoms_contracted = 0
+
+    def find_base(self, v):
+        base = self.base
+        while base[v] != v:
+            base[v] = base[base[v]]
+            v = base[v]
+        return v
+
+    def lowest_common_ancestor(self, a, b):
+        mate, parent, ancestor_stamps = self.mate, self.parent, self.ancestor_stamps
+        stamp = self.blossoms_contracted
+
+        while True:
+            a = self.find_base(a)
+            ancestor_stamps[a] = stamp
+            if mate[a] == -1:
+                break
+            a = parent[mate[a]]
+
+        while True:
+            b = self.find_base(b)
+            if ancestor_stamps[b] == stamp:
+                return b
+            b = parent[mate[b]]
+
+    def mark_blossom_path(self, v, blossom_base, child, blossom_bases):
+        mate, parent = self.mate, self.parent
+        while self.find_base(v) != blossom_base:
+            blossom_bases.append(self.find_base(v))
+            blossom_bases.append(self.find_base(mate[v]))
+            parent[v] = child
+            child = mate[v]
+            v = parent[mate[v]]
+
+    def contract_blossom(self, v, to):
+        """
+        merges the blossom closed by the edge between the even vertices v and
+        to into its base, and returns the bases of the blossoms it absorbed
+        """
+        blossom_base = self.lowest_common_ancestor(v, to)
+        self.blossoms_contracted += 1
+
+        blossom_bases = []
+        self.mark_blossom_path(v, blossom_base, to, blossom_bases)
+        self.mark_blossom_path(to, blossom_base, v, blossom_bases)
+
+        for blossom_member_base in blossom_bases:
+            if blossom_member_base != blossom_base:
+                self.base[blossom_member_base] = blossom_base
+
+        return blossom_bases
+
+
+def greedy_matching(adjacency):
+    """
+    a maximal matching found by pairing each unmatched vertex with its first
+    unmatched neighbour, as the list mate
+
+    >>> greedy_matching([[1, 2], [0, 2], [0, 1, 3], [2]])
+    [1, 0, 3, 2]
+    """
+    mate = [-1] * len(adjacency)
+
+    for v, neighbours in enumerate(adjacency):
+        if mate[v] == -1:
+            for w in neighbours:
+                if mate[w] == -1:
+                    mate[v], mate[w] = w, v
+                    break
+
+    return mate
+
+
+def augment_from_vertex(root, adjacency, mate):
+    """
+    Grows an alternating tree from the unmatched vertex root and, if an
+    augmenting path is found, flips it in mate (mate[v] == -1 when v is
+    unmatched). Returns True if the matching grew.
+
+    This is the same blossom algorithm as find_augmenting_path, except that
+    blossoms are never contracted into a new graph: they are tracked in a
+    BlossomForest instead.
+
+    >>> adjacency = [[1], [0, 2], [1, 3], [2]]
+    >>> mate = [-1, 2, 1, -1]
+    >>> augment_from_vertex(0, adjacency, mate)
+    True
+    >>> mate
+    [1, 0, 3, 2]
+    """
+    forest = BlossomForest(mate)
+    parent, find_base = forest.parent, forest.find_base
+    in_tree = bytearray(len(adjacency))
+
+    in_tree[root] = 1
+    queue = collections.deque([root])
+
+    while queue:
+        v = queue.popleft()
+
+        for to in adjacency[v]:
+            if find_base(v) == find_base(to) or mate[v] == to:
+                continue
+
+            if to == root or mate[to] != -1 and parent[mate[to]] != -1:
+                # v and to are both even, so the edge closes a blossom
+                for blossom_member_base in forest.contract_blossom(v, to):
+                    # the odd vertices of the blossom become even
+                    if not in_tree[blossom_member_base]:
+                        in_tree[blossom_member_base] = 1
+                        queue.append(blossom_member_base)
+            elif parent[to] == -1:
+                parent[to] = v
+
+                if mate[to] == -1:
+                    # augment along the path from to back to root
+                    while to != -1:
+                        previous_mate = mate[parent[to]]
+                        mate[to] = parent[to]
+                        mate[parent[to]] = to
+                        to = previous_mate
+
+                    count_matching_event('augmentations')
+                    count_matching_event('blossom_contractions', forest.blossoms_contracted)
+                    return True
+
+                in_tree[mate[to]] = 1
+                queue.append(mate[to])
+
+    count_matching_event('blossom_contractions', forest.blossoms_contracted)
+    return False
+
+
+def find_maximum_matching_edmonds(adjacency):
+    """
+    An iterative O(V^3) version of find_maximum_matching for graphs given as
+    adjacency lists. The matching is seeded greedily, then augment_from_vertex
+    is tried once from each vertex that is still unmatched (if there is no
+    augmenting path from a vertex, augmenting elsewhere never creates one).
+    Returns the list mate where mate[v] == -1 iff v is unmatched.
+
+    >>> find_maximum_matching_edmonds([[1, 2], [0, 2], [0, 1, 3], [2]])
+    [1, 0, 3, 2]
+    """
+    mate = greedy_matching(adjacency)
+
+    for v in range(len(adjacency)):
+        if mate[v] == -1:
+            augment_from_vertex(v, adjacency, mate)
+
+    return mate
+
+
+def augmenting_phase(adjacency, mate, odd_vertices=None):
+    """
+    Grows alternating trees from every unmatched vertex at once, breadth first,
+    and augments along each edge found between two different trees. Once a
+    tree has been augmented it is retired for the rest of the phase, so the
+    augmenting paths of one phase are vertex-disjoint (and, because the trees
+    grow breadth first, short). Blossoms inside a tree are handled as in
+    augment_from_vertex. Returns the number of augmentations; if it is zero,
+    the search covered the whole graph and mate is a maximum matching. If a
+    list odd_vertices is given, the vertices left at odd distance from the
+    roots are appended to it (see tutte_berge_witness).
+
+    >>> adjacency = [[1], [0, 2], [1, 3], [2, 4], [3, 5], [4]]
+    >>> mate = [-1, 2, 1, 4, 3, -1]
+    >>> augmenting_phase(adjacency, mate), mate
+    (1, [1, 0, 3, 2, 5, 4])
+    >>> augmenting_phase(adjacency, mate)
+    0
+    """
+    n = len(adjacency)
+    forest = BlossomForest(mate)
+    parent, find_base = forest.parent, forest.find_base
+    in_tree = bytearray(n)
+    tree_of = [-1] * n
+    retired = bytearray(n)
+
+    def flip_path_to_root(v):
+        # v keeps its (stale) mate, which the caller then overwrites
+        w = mate[v]
+        while w != -1:
+            previous_mate = mate[parent[w]]
+            mate[w] = parent[w]
+            mate[parent[w]] = w
+            w = previous_mate
+
+    queue = collections.deque()
+    for v in range(n):
+        if mate[v] == -1 and adjacency[v]:
+            in_tree[v] = 1
+            tree_of[v] = v
+            queue.append(v)
+
+    augmentations = 0
+
+    while queue:
+        v = queue.popleft()
+
+        for to in adjacency[v]:
+            if retired[tree_of[v]]:
+                break
+            if find_base(v) == find_base(to) or mate[v] == to:
+                continue
+            if tree_of[to] != -1 and retired[tree_of[to]]:
+                continue
+
+            if tree_of[to] != -1 and (mate[to] == -1 or parent[mate[to]] != -1):
+                if tree_of[to] != tree_of[v]:
+                    # the roots of the two trees are joined by an augmenting path
+                    flip_path_to_root(v)
+                    flip_path_to_root(to)
+                    mate[v], mate[to] = to, v
+
+                    retired[tree_of[v]] = retired[tree_of[to]] = 1
+                    augmentations += 1
+                    continue
+
+                for blossom_member_base in forest.contract_blossom(v, to):
+                    if not in_tree[blossom_member_base]:
+                        in_tree[blossom_member_base] = 1
+                        queue.append(blossom_member_base)
+            elif tree_of[to] == -1:
+                # to is matched (every unmatched vertex is a root), so add to and its mate
+                parent[to] = v
+                tree_of[to] = tree_of[mate[to]] = tree_of[v]
+                in_tree[mate[to]] = 1
+                queue.append(mate[to])
+
+    if odd_vertices is not None:
+        odd_vertices.extend(v for v in range(n) if tree_of[v] != -1 and not in_tree[v])
+
+    count_matching_event('phases')
+    count_matching_event('augmentations', augmentations)
+    count_matching_event('blossom_contractions', forest.blossoms_contracted)
+    return augmentations
+
+
+def find_maximum_matching_phases(adjacency):
+    """
+    Starts from a greedy matching and runs augmenting_phase until a phase
+    finds nothing. Each phase augments a maximal set of vertex-disjoint
+    augmenting paths for the cost of one search, so only a few phases are
+    needed even for tens of thousands of vertices. Returns the list mate
+    as find_maximum_matching_edmonds does.
+
+    >>> find_maximum_matching_phases([[1, 2], [0, 2], [0, 1, 3], [2]])
+    [1, 0, 3, 2]
+    """
+    mate = greedy_matching(adjacency)
+
+    while augmenting_phase(adjacency, mate) > 0:
+        pass
+
+    return mate
+
+
+def random_banana_list(n, seed=0):
+    """
+    a random list of n banana counts where about half of the counts are
+    (2^k - 1) multiples of a few shared values, so that the trainers graph
+    is not trivially complete
+
+    >>> len(random_banana_list(10)), random_banana_list(10) == random_banana_list(10)
+    (10, True)
+    """
+    rng = random.Random(seed)
+    shared_values = [rng.randint(1, 1000) for _ in range(max(1, n // 20))]
+
+    banana_list = []
+    for _ in range(n):
+        if rng.random() < 0.5:
+            banana_list.append(rng.choice(shared_values) * (2 ** rng.randint(1, 6) - 1))
+        else:
+            banana_list.append(rng.randint(1, 1073741823))
+
+    return banana_list
+
+
+def benchmark_matching_engines(sizes, engines=('reference', 'bitset', 'edmonds', 'phases', 'dense'), seed=0, reference_limit=100, bitset_limit=300):
+    """
+    times solution with each engine on random_banana_list inputs of each size
+    (the reference engine only up to reference_limit trainers, and the bitset
+    engine, whose running time grows faster than cubically, only up to
+    bitset_limit), returning a list of (engine, size, unmatched trainers,
+    seconds)
+
+    >>> results = benchmark_matching_engines([20], engines=('edmonds', 'phases'))
+    >>> [(engine, size) for (engine, size, _, _) in results]
+    [('edmonds', 20), ('phases', 20)]
+    >>> len(set(unmatched for (_, _, unmatched, _) in results))
+    1
+    """
+    results = []
+    for size in sizes:
+        banana_list = random_banana_list(size, seed)
+
+        for engine in engines:
+            if engine == 'reference' and size > reference_limit:
+                continue
+            if engine == 'bitset' and size > bitset_limit:
+                continue
+
+            start_time = timeit.default_timer()
+            unmatched_trainers = solution(banana_list, engine=engine)
+            results.append((engine, size, unmatched_trainers, timeit.default_timer() - start_time))
+
+    return results
+
+
+def find_maximum_matching_dense(graph, short_augmentation_limit=100):
+    """
+    A maximum matching of a SparseComplementGraph, for graphs that are nearly
+    complete. Trainers with the most non-neighbours are matched greedily first,
+    each to the next unmatched trainer it is adjacent to (a union-find over
+    positions skips the trainers that are already matched). The trainers left
+    unmatched are pairwise non-adjacent, and two of them, u and v, can usually
+    be matched by the augmenting path u - w = x - v for almost any matched pair
+    (w, x). Only if two or more trainers are still unmatched after that is a full
+    search (augmenting_phase) needed. Returns the list mate as
+    find_maximum_matching_edmonds does.
+
+    >>> graph = SparseComplementGraph([1, 3, 7, 5, 15, 21])
+    >>> mate = find_maximum_matching_dense(graph)
+    >>> mate.count(-1), all(graph.adjacent(v, mate[v]) for v in range(6))
+    (0, True)
+
+    >>> find_maximum_matching_dense(SparseComplementGraph([1, 1, 31]))
+    [-1, -1, -1]
+    """
+    n = len(graph)
+    mate = [-1] * n
+    order = sorted(range(n), key=graph.complement_degree, reverse=True)
+
+    # next_unmatched[i] leads (through a chain of matched positions) to the
+    # first position >= i in order whose trainer is unmatched
+    next_unmatched = list(range(n + 1))
+
+    def find_next_unmatched(i):
+        while next_unmatched[i] != i:
+            next_unmatched[i] = next_unmatched[next_unmatched[i]]
+            i = next_unmatched[i]
+        return i
+
+    for i, u in enumerate(order):
+        if mate[u] != -1:
+            continue
+
+        j = find_next_unmatched(i + 1)
+        while j < n:
+            if graph.adjacent(u, order[j]):
+                v = order[j]
+                mate[u], mate[v] = v, u
+                next_unmatched[i], next_unmatched[j] = i + 1, j + 1
+                break
+            j = find_next_unmatched(j + 1)
+
+    unmatched = [u for u in order if mate[u] == -1 and graph.complement_degree(u) < n - 1]
+
+    if len(unmatched) <= short_augmentation_limit:
+        for u_index, u in enumerate(unmatched):
+            for v in unmatched[u_index + 1:]:
+                if mate[u] != -1:
+                    break
+                if mate[v] != -1:
+                    continue
+
+                for w in order:
+                    x = mate[w]
+                    if x != -1 and graph.adjacent(u, w) and graph.adjacent(x, v):
+                        mate[u], mate[w] = w, u
+                        mate[x], mate[v] = v, x
+                        count_matching_event('short_augmentations')
+                        break
+
+    if sum(1 for u in unmatched if mate[u] == -1) >= 2:
+        while augmenting_phase(graph, mate) > 0:
+            pass
+
+    return mate
+
+
+def augment_from_vertex_dense(root, graph, mate):
+    """
+    augment_from_vertex for a SparseComplementGraph, without ever listing the
+    (dense) neighbours of a vertex. When an even vertex v is searched, its
+    neighbours outside the tree are all the trainers still outside it except
+    v's few non-neighbours, as in connected_components, and of the even
+    vertices in each other blossom only one neighbour is needed, since the
+    edge to it merges the two blossoms. Each trainer or blossom looked at is
+    either taken into the tree, merged, or skipped for a non-neighbour, so a
+    search costs O(n + complement edges) (up to the union-finds) rather than
+    O(n^2).
+
+    >>> mate = [2, -1, 0, -1]
+    >>> augment_from_vertex_dense(1, SparseComplementGraph([1, 3, 5, 21]), mate)
+    True
+    >>> mate
+    [3, 2, 1, 0]
+    """
+    forest = BlossomForest(mate)
+    parent, find_base = forest.parent, forest.find_base
+    even = bytearray(len(graph))
+    unvisited = set(graph.trainers())
+
+    even[root] = 1
+    unvisited.discard(root)
+    # the even vertices of each outermost blossom, by the blossom's base
+    even_members = {root: [root]}
+    queue = collections.deque([root])
+    group_of = graph.group_of
+
+    while queue:
+        v = queue.popleft()
+        # w is a non-neighbour of v iff group_of[w] is in non_looping_groups
+        non_looping_groups = graph.non_looping_groups[group_of[v]]
+
+        for to in [w for w in unvisited if group_of[w] not in non_looping_groups]:
+            if to not in unvisited:
+                # taken into the tree as the mate of an earlier neighbour
+                continue
+
+            parent[to] = v
+
+            if mate[to] == -1:
+                # augment along the path from to back to root
+                while to != -1:
+                    previous_mate = mate[parent[to]]
+                    mate[to] = parent[to]
+                    mate[parent[to]] = to
+                    to = previous_mate
+
+                count_matching_event('augmentations')
+                count_matching_event('blossom_contractions', forest.blossoms_contracted)
+                return True
+
+            unvisited.discard(to)
+            unvisited.discard(mate[to])
+            even[mate[to]] = 1
+            even_members[mate[to]] = [mate[to]]
+            queue.append(mate[to])
+
+        for blossom_base in list(even_members):
+            if blossom_base not in even_members or blossom_base == find_base(v):
+                continue
+
+            to = next((w for w in even_members[blossom_base] if group_of[w] not in non_looping_groups), None)
+            if to is None:
+                continue
+
+            # v and to are both even, so the edge closes a blossom
+            merged_members = []
+            for blossom_member_base in forest.contract_blossom(v, to):
+                if not even[blossom_member_base]:
+                    # the odd vertices of the blossom become even
+                    even[blossom_member_base] = 1
+                    merged_members.append([blossom_member_base])
+                    queue.append(blossom_member_base)
+                elif blossom_member_base in even_members:
+                    merged_members.append(even_members.pop(blossom_member_base))
+
+            # the largest list absorbs the others, so each vertex is copied O(log n) times
+            merged_members.sort(key=len)
+            members = merged_members.pop()
+            for other_members in merged_members:
+                members.extend(other_members)
+            even_members[find_base(v)] = members
+
+    count_matching_event('blossom_contractions', forest.blossoms_contracted)
+    return False
+
+
+def match_component(banana_list):
+    """
+    the mate list of a maximum matching of the trainers graph of banana_list
+    (a top level function so that it can be run in a worker process)
+    """
+    return find_maximum_matching_dense(SparseComplementGraph(banana_list))
+
+
+def find_maximum_matching_by_components(banana_list, workers=None, inline_limit=5000):
+    """
+    Splits the trainers graph into connected components (each component can
+    be matched on its own), matches components of up to inline_limit trainers
+    in this process and sends the larger ones to a pool of `workers` processes.
+    Returns the list mate as find_maximum_matching_edmonds does.
+
+    >>> find_maximum_matching_by_components([21, 1, 1, 7, 3, 3])
+    [1, 0, -1, 4, 3, -1]
+    >>> find_maximum_matching_by_components([21, 1, 1, 7, 3, 3], inline_limit=0)
+    [1, 0, -1, 4, 3, -1]
+    """
+    components = SparseComplementGraph(banana_list).connected_components()
+    mate = [-1] * len(banana_list)
+
+    def copy_component_mates(component, component_mates):
+        for local_u, local_v in enumerate(component_mates):
+            if local_v != -1:
+                mate[component[local_u]] = component[local_v]
+
+    large_components = [component for component in components if len(component) > inline_limit]
+
+    for component in components:
+        if 1 < len(component) <= inline_limit:
+            copy_component_mates(component, match_component([banana_list[u] for u in component]))
+
+    if large_components:
+        # imported here so that importing this module doesn't pay for multiprocessing
+        import concurrent.futures
+
+        with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as executor:
+            component_futures = [(component, executor.submit(match_component, [banana_list[u] for u in component]))
+                                 for component in large_components]
+
+            for component, component_future in component_futures:
+                copy_component_mates(component, component_future.result())
+
+    return mate
+
+
+def trainer_pairing(banana_list):
+    """
+    a maximum matching of the trainers as a compact array, where
+    mate[i] is the trainer paired with trainer i (or -1)
+
+    >>> trainer_pairing([1, 7, 3, 21, 13, 19])
+    array('i', [3, 2, 1, 0, 5, 4])
+    """
+    return array.array('i', find_maximum_matching_dense(SparseComplementGraph(banana_list)))
+
+
+def iter_trainer_pairs(mate, chunk_size=4096):
+    """
+    streams the pairs (i, mate[i]) with i < mate[i] in lists of up to chunk_size pairs
+
+    >>> list(iter_trainer_pairs(array.array('i', [3, 4, 5, 0, 1, 2]), chunk_size=2))
+    [[(0, 3), (1, 4)], [(2, 5)]]
+    """
+    chunk = []
+    for trainer, partner in enumerate(mate):
+        if trainer < partner:
+            chunk.append((trainer, partner))
+            if len(chunk) == chunk_size:
+                yield chunk
+                chunk = []
+
+    if chunk:
+        yield chunk
+
+
+def tutte_berge_witness(banana_list, mate):
+    """
+    Returns a set A of trainers certifying that mate is a maximum matching:
+    by the Tutte-Berge formula, every matching leaves at least
+    (number of odd components of the graph without A) - |A| trainers
+    unmatched, and mate leaves exactly that many. A is the set of trainers at
+    odd distance from the unmatched trainers after a complete search (the
+    Gallai-Edmonds decomposition). Raises ValueError if mate is not maximum.
+
+    >>> banana_list = [14, 14, 3, 2]
+    >>> mate = trainer_pairing(banana_list)
+    >>> witness = tutte_berge_witness(banana_list, mate)
+    >>> mate, witness
+    (array('i', [2, -1, 0, -1]), [2])
+    >>> verify_trainer_pairing(banana_list, mate, witness)
+    True
+    """
+    if list(mate).count(-1) <= 1:
+        # a matching that leaves at most one trainer unmatched is maximum
+        return []
+
+    odd_vertices = []
+    if augmenting_phase(SparseComplementGraph(banana_list), list(mate), odd_vertices) > 0:
+        raise ValueError("the matching is not a maximum matching")
+
+    return sorted(odd_vertices)
+
+
+def verify_trainer_pairing(banana_list, mate, witness):
+    """
+    Checks, without solving the matching problem again, that mate is a
+    valid matching of the trainers graph and that the Tutte-Berge witness
+    (from tutte_berge_witness) proves that it is maximum.
+
+    >>> verify_trainer_pairing([1, 7, 3, 21, 13, 19], array.array('i', [3, 4, 5, 0, 1, 2]), [])
+    True
+    >>> verify_trainer_pairing([1, 7, 3, 21, 13, 19], array.array('i', [-1, 4, 5, -1, 1, 2]), [])
+    False
+    >>> verify_trainer_pairing([1, 1, 31], array.array('i', [1, 0, -1]), [])
+    False
+    """
+    for trainer, partner in enumerate(mate):
+        if partner != -1 and (mate[partner] != trainer or
+                              not will_thumb_wrestle_forever(banana_list[trainer], banana_list[partner])):
+            return False
+
+    witness_set = set(witness)
+    remaining_trainers = [trainer for trainer in range(len(banana_list)) if trainer not in witness_set]
+    remaining_graph = SparseComplementGraph([banana_list[trainer] for trainer in remaining_trainers])
+    odd_components = sum(1 for component in remaining_graph.connected_components() if len(component) % 2 == 1)
+
+    return list(mate).count(-1) == odd_components - len(witness_set)
+
+
+def trainers_adjacency_lists(banana_list):
+    """
+    the trainers graph as adjacency lists (an edge between two trainers
+    iff they will thumb wrestle forever)
+
+    >>> trainers_adjacency_lists([1, 3, 21])
+    [[2], [], [0]]
+    """
+    numpy = load_numpy()
+    if numpy is None:
+        return SparseComplementGraph(banana_list).adjacency_lists()
+
+    return [numpy.flatnonzero(wrestle_forever_mask(bananas, banana_list)).tolist() for bananas in banana_list]
+
+
+class TrainerRoster:
+    """
+    Keeps a maximum matching of the trainers graph up to date while trainers
+    join and leave, so the number of unmatched trainers does not have to be
+    recomputed from scratch. Adding a trainer can only create augmenting
+    paths that end at the new trainer, and removing a matched trainer can only
+    create augmenting paths that end at its old partner, so each change needs
+    at most one augment_from_vertex_dense search (and none if at most one
+    trainer is unmatched). The graph is kept as a SparseComplementGraph, so
+    each change costs O(n + complement edges) rather than O(n^2).
+
+    >>> roster = TrainerRoster()
+    >>> [roster.add(trainer, bananas) for (trainer, bananas) in enumerate([1, 7, 3, 21, 13, 19])]
+    [1, 2, 1, 0, 1, 0]
+    >>> roster.remove(3)
+    1
+    >>> roster.add('new trainer', 1)
+    0
+    >>> roster.unmatched_count() == solution([1, 7, 3, 13, 19, 1], engine='edmonds')
+    True
+
+    >>> TrainerRoster([1, 1, 31]).add(3, 3)
+    2
+    """
+    def __init__(self, banana_list=()):
+        # the initial roster (trainers 0, 1, ...) is matched in one go
+        self.graph = SparseComplementGraph(banana_list)
+        self.mate = find_maximum_matching_dense(self.graph)
+        self.vertex_of_trainer = {trainer: trainer for trainer in range(len(self.graph))}
+        self.free_vertices = []
+        self.matched_pairs = (len(self.mate) - self.mate.count(-1)) // 2
+
+    def unmatched_count(self):
+        return len(self.vertex_of_trainer) - 2 * self.matched_pairs
+
+    def add(self, trainer, bananas):
+        """
+        adds a trainer (any hashable id) and returns the new number of unmatched trainers
+        """
+        assert trainer not in self.vertex_of_trainer, "trainer " + str(trainer) + " is already in the roster"
+
+        if self.free_vertices:
+            u = self.graph.add_trainer(bananas, self.free_vertices.pop())
+        else:
+            u = self.graph.add_trainer(bananas)
+            self.mate.append(-1)
+
+        self.vertex_of_trainer[trainer] = u
+
+        if self.unmatched_count() > 1 and augment_from_vertex_dense(u, self.graph, self.mate):
+            self.matched_pairs += 1
+
+        return self.unmatched_count()
+
+    def remove(self, trainer):
+        """
+        removes a trainer and returns the new number of unmatched trainers
+        """
+        u = self.vertex_of_trainer.pop(trainer)
+        self.graph.remove_trainer(u)
+        self.free_vertices.append(u)
+
+        partner = self.mate[u]
+        if partner != -1:
+            self.mate[u] = self.mate[partner] = -1
+            self.matched_pairs -= 1
+
+            if self.unmatched_count() > 1 and augment_from_vertex_dense(partner, self.graph, self.mate):
+                self.matched_pairs += 1
+
+        return self.unmatched_count()
+
+
+def solution(banana_list, engine=None):
     """
     Returns the fewest possible number of trainers left to watch the workers after
     pairing the trainers up. The optimal strategy is to find a maximum matching in
     the graph constructed with the vertices as the set of trainers and an edge
     between two trainers if they will play forever.
 
-    >>> solution([1, 7, 3, 21, 13, 19])
+    >>> solution([1, 7, 3, 21, 13, 19], engine='dense')
     0
 
-    >>> solution([1, 1])
+    >>> solution([1, 1], engine='dense')
     2
 
-    >>> solution([1, 1, 31])
+    >>> solution([1, 1, 31], engine='dense')
     3
 
-    >>> solution([10, 10, 310, 10, 10, 630, 10, 10, 10737418230])
+    >>> solution([10, 10, 310, 10, 10, 630, 10, 10, 10737418230], engine='dense')
+    7
+
+    The matching engine can be selected: 'reference' (find_maximum_matching on
+    an adjacency matrix), 'edmonds' (find_maximum_matching_edmonds on adjacency
+    lists, which scales to thousands of trainers) or 'phases'
+    (find_maximum_matching_phases, for tens of thousands), 'dense'
+    (find_maximum_matching_dense, which never builds the full graph),
+    'bitset' (find_maximum_matching_bitset, the reference algorithm on
+    adjacency bitsets) or 'components' (find_maximum_matching_by_components,
+    which matches the connected components in parallel). By default autotune
+    picks the fastest of 'edmonds', 'phases' and 'dense' for the number of
+    trainers.
+
+    >>> solution([10, 10, 310, 10, 10, 630, 10, 10, 10737418230], engine='edmonds')
+    7
+
+    >>> solution([10, 10, 310, 10, 10, 630, 10, 10, 10737418230], engine='phases')
+    7
+
+    >>> solution([10, 10, 310, 10, 10, 630, 10, 10, 10737418230], engine='dense')
+    7
+
+    >>> solution([10, 10, 310, 10, 10, 630, 10, 10, 10737418230], engine='bitset')
+    7
+
+    >>> solution([10, 10, 310, 10, 10, 630, 10, 10, 10737418230], engine='components')
     7
     """
+    if engine is None:
+        engine = autotune.choose_engine('distract_the_trainers', banana_list)
+
+    if engine == 'edmonds':
+        trainers_mates = find_maximum_matching_edmonds(trainers_adjacency_lists(banana_list))
+        return trainers_mates.count(-1)
+    elif engine == 'phases':
+        trainers_mates = find_maximum_matching_phases(trainers_adjacency_lists(banana_list))
+        return trainers_mates.count(-1)
+    elif engine == 'dense':
+        trainers_mates = find_maximum_matching_dense(SparseComplementGraph(banana_list))
+        return trainers_mates.count(-1)
+    elif engine == 'components':
+        return find_maximum_matching_by_components(banana_list).count(-1)
+    elif engine == 'bitset':
+        maximum_matching_of_trainers = find_maximum_matching_bitset(
+            SparseComplementGraph(banana_list).adjacency_bitsets())
+        return len(banana_list) - len(maximum_matching_of_trainers)
+    elif engine != 'reference':
+        raise ValueError("unknown matching engine " + repr(engine))
+
     trainers = range(0, len(banana_list))
     trainers_graph = [[0 for _ in trainers] for _ in trainers]
 
@@ -577,7 +1790,8 @@ def solution(banana_list):
 #         print(".", flush=True, end='')
 
 
-xs = [203161946, 46012376, 454235495, 9872262, 860780278, 197464525, 643057098, 662264437, 423982331, 144996911, 934830905, 701846349, 860387750, 867507160, 337490049, 476779286, 623834766, 156829067, 305062633, 1039106442, 1023704758, 911993184, 14603919, 721338620, 314214148, 457984596, 1024582044, 969117571, 985158986, 874241179, 723909975, 1071523793, 180609666, 664291922, 355526708, 156039954, 317160798, 139317759, 687761421, 62136336, 91845915, 604109522, 981873294, 964072635, 37731476, 760987531, 559483713, 4883062, 241263168,
-      382575783, 972363985, 551378921, 538959284, 991630244, 737730354, 426932060, 811438376, 861701019, 859358096, 777388852, 771562389, 111173427, 453535601, 718472425, 198119448, 88269878, 746436447, 30549235, 64336272, 104197032, 594172351, 398445185, 696646185, 108333305, 325434458, 995753609, 530973358, 939619701, 541487198, 390691903, 38014202, 750015501, 735627533, 427261824, 102619031, 883292254, 719791379, 819780009, 586982754, 238620470, 415443497, 34247781, 143369387, 671543525, 700277994, 969504215, 1035429122, 115483185, 421991849]
-print xs
-print solution(xs)
+if __name__ == '__main__':
+    xs = [203161946, 46012376, 454235495, 9872262, 860780278, 197464525, 643057098, 662264437, 423982331, 144996911, 934830905, 701846349, 860387750, 867507160, 337490049, 476779286, 623834766, 156829067, 305062633, 1039106442, 1023704758, 911993184, 14603919, 721338620, 314214148, 457984596, 1024582044, 969117571, 985158986, 874241179, 723909975, 1071523793, 180609666, 664291922, 355526708, 156039954, 317160798, 139317759, 687761421, 62136336, 91845915, 604109522, 981873294, 964072635, 37731476, 760987531, 559483713, 4883062, 241263168,
+          382575783, 972363985, 551378921, 538959284, 991630244, 737730354, 426932060, 811438376, 861701019, 859358096, 777388852, 771562389, 111173427, 453535601, 718472425, 198119448, 88269878, 746436447, 30549235, 64336272, 104197032, 594172351, 398445185, 696646185, 108333305, 325434458, 995753609, 530973358, 939619701, 541487198, 390691903, 38014202, 750015501, 735627533, 427261824, 102619031, 883292254, 719791379, 819780009, 586982754, 238620470, 415443497, 34247781, 143369387, 671543525, 700277994, 969504215, 1035429122, 115483185, 421991849]
+    print(xs)
+    print(solution(xs))
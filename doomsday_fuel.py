@@ -91,7 +91,24 @@ next = [0, 1, 0, 0, 0, 1]
 
 """
 
-from fractions import Fraction, gcd
+import array
+import collections
+import sys
+import timeit
+from fractions import Fraction
+from functools import reduce
+
+import autotune
+import instrumentation
+
+try:
+    from fractions import gcd
+except ImportError:
+    # fractions.gcd was removed in Python 3.9 and math.gcd only takes ints
+    def gcd(a, b):
+        while b:
+            a, b = b, a % b
+        return a
 
 s = [[0, 1, 0, 0, 0, 1],
      [0, 99, 1, 0, 0, 0],
@@ -101,10 +118,95 @@ s = [[0, 1, 0, 0, 0, 1],
      [0, 0, 0, 0, 0, 0]]
 
 
-def solution(m):
+def reachable_transient_states(m):
+    """
+    the non-terminal states that can be reached from state 0, in the order
+    they are found (so state 0 comes first)
+
+    >>> reachable_transient_states([[0, 1, 0, 0], [0, 0, 0, 1], [0, 1, 0, 0], [0, 0, 0, 0]])
+    [0, 1]
+    """
+    found = [0]
+    seen = {0}
+    for state in found:
+        for next_state, weight in enumerate(m[state]):
+            if weight and next_state not in seen and sum(m[next_state]) > 0:
+                seen.add(next_state)
+                found.append(next_state)
+
+    return found
+
+
+def fraction_free_solution(m):
+    """
+    The same answer as solution, computed with integer arithmetic only.
+
+    With W[i][j] = (sum of row i) * [i == j] - m[i][j] over the transient
+    states, the absorption probabilities from state 0 are y . m[:, terminal]
+    where y solves W^T y = e0. That system is solved with fraction-free
+    (Bareiss) Gauss-Jordan elimination, where every division is exact, so
+    y = z / d for integer z and d without a single Fraction.
+
+    >>> fraction_free_solution([[0, 1, 0, 0, 0, 1], [4, 0, 0, 3, 2, 0], [0, 0, 0, 0, 0, 0],\
+        [0, 0, 0, 0, 0, 0], [0, 0, 0, 0, 0, 0], [0, 0, 0, 0, 0, 0]])
+    [0, 3, 2, 9, 14]
+    >>> fraction_free_solution([[0, 2, 1, 0, 0], [0, 0, 0, 3, 4], [0, 0, 0, 0, 0], [0, 0, 0, 0, 0], [0, 0, 0, 0, 0]])
+    [7, 6, 8, 21]
+    """
+    terminal_states = [state for state in range(len(m)) if sum(m[state]) == 0]
+    if sum(m[0]) == 0:
+        return [1] + [0] * (len(terminal_states) - 1) + [1]
+
+    transient_states = reachable_transient_states(m)
+    size = len(transient_states)
+
+    # the augmented matrix [W^T | e0]
+    rows = [[(sum(m[row_state]) if row_state == column_state else 0) - m[row_state][column_state]
+             for row_state in transient_states] + [int(column_state == 0)]
+            for column_state in transient_states]
+
+    with instrumentation.timed('doomsday_fuel.elimination'):
+        previous_pivot = 1
+        for pivot in range(size):
+            if rows[pivot][pivot] == 0:
+                swap = next(row for row in range(pivot + 1, size) if rows[row][pivot] != 0)
+                rows[pivot], rows[swap] = rows[swap], rows[pivot]
+
+            pivot_row = rows[pivot]
+            pivot_value = pivot_row[pivot]
+            for row in range(size):
+                if row == pivot:
+                    continue
+
+                current_row = rows[row]
+                factor = current_row[pivot]
+                for column in range(size + 1):
+                    if column != pivot:
+                        current_row[column] = (pivot_value * current_row[column]
+                                               - factor * pivot_row[column]) // previous_pivot
+                current_row[pivot] = 0
+
+            previous_pivot = pivot_value
+
+    # every diagonal entry is now the determinant d, and y = (last column) / d
+    determinant = rows[0][0]
+    numerators = [sum(rows[row][size] * m[transient_states[row]][terminal_state] for row in range(size))
+                  for terminal_state in terminal_states]
+
+    # dividing by a divisor with the sign of d leaves a positive denominator
+    common_divisor = abs(reduce(gcd, numerators, determinant)) * (1 if determinant > 0 else -1)
+
+    return [numerator // common_divisor for numerator in numerators] + [determinant // common_divisor]
+
+
+def solution(m, engine=None):
     """
     Doomsday fuel
 
+    The elimination engine can be selected: 'fractions' (the elimination
+    below, on Fractions) or 'fraction_free' (fraction_free_solution). By
+    default autotune picks the faster one for the number of states.
+
     >>> s = [\
         [0, 1, 0, 0, 0, 1],\
         [0, 99, 1, 0, 0, 0],\
@@ -112,7 +214,7 @@ def solution(m):
         [0, 0, 0, 0, 0, 0],\
         [0, 0, 0, 0, 0, 0],\
         [0, 0, 0, 0, 0, 0]]
-     >>> solution(s)
+     >>> solution(s, engine='fractions')
      [1, 0, 0, 1, 2]
 
     >>> s = [\
@@ -122,7 +224,7 @@ def solution(m):
         [0, 0, 0, 0, 0, 0],\
         [0, 0, 0, 0, 0, 0],\
         [0, 0, 0, 0, 0, 0]]
-    >>> solution(s)
+    >>> solution(s, engine='fractions')
     [0, 3, 2, 9, 14]
 
     >>> s = [\
@@ -131,9 +233,18 @@ def solution(m):
         [0, 0, 0, 0, 0],\
         [0, 0, 0, 0, 0],\
         [0, 0, 0, 0, 0]]
-    >>> solution(s)
+    >>> solution(s, engine='fractions')
+    [7, 6, 8, 21]
+    >>> solution(s, engine='fraction_free')
     [7, 6, 8, 21]
      """
+    if engine is None:
+        engine = autotune.choose_engine('doomsday_fuel', m)
+    if engine == 'fraction_free':
+        return fraction_free_solution(m)
+    elif engine != 'fractions':
+        raise ValueError("unknown elimination engine " + repr(engine))
+
     # construct a new input n where n has an additional start state - reason explained below
     old_states = range(0, len(m))
 
@@ -164,6 +275,10 @@ def solution(m):
         [0] * len(new_states)] + path_count_equation_coefficients
     path_count_equation_coefficients[1][0] = 1
 
+    stats = instrumentation.active()
+    # the arithmetic operations on coefficients, counted row by row while stats are collected
+    fraction_operations = 0
+
     # It may be that some states, e.g. sk, lead to themselves, so the number of paths that reach them C[sk]
     # is a function of C[sk]. We re-write C[sk] using only the coefficients for other states.
     for state in new_states[1:]:
@@ -172,6 +287,10 @@ def solution(m):
         new_coefficients = [coefficient * scale_factor for coefficient in old_coefficients]
         new_coefficients[state] = 0
         path_count_equation_coefficients[state] = new_coefficients
+        if stats is not None:
+            fraction_operations += 2 + len(old_coefficients)
+
+    elimination_start = timeit.default_timer()
 
     # In this loop the algorithm eliminates each coefficient from the equations corresponding
     # to each state, except s0. To be concrete, for each state_to_eliminate sk where k > 0, it ensures that
@@ -205,19 +324,167 @@ def solution(m):
             new_coefficients = [coefficient *
                                 self_referential_scale_factor for coefficient in new_coefficients]
             new_coefficients[state_to_modify] = 0
+            if stats is not None:
+                # a multiplication and an addition for each coefficient but the two zeroed
+                # ones, three operations for the scale factor and one multiplication each to scale
+                fraction_operations += 2 * (len(new_coefficients) - 2) + 3 + len(new_coefficients)
 
             path_count_equation_coefficients[state_to_modify] = new_coefficients
 
+        if stats is not None:
+            stats.observe('doomsday_fuel.denominator_bits', max(
+                Fraction(coefficient).denominator.bit_length()
+                for coefficients in path_count_equation_coefficients for coefficient in coefficients))
+
+    if stats is not None:
+        stats.count('doomsday_fuel.fraction_operations', fraction_operations)
+        stats.add_time('doomsday_fuel.elimination', timeit.default_timer() - elimination_start)
+
     # we must return the 'terminal' state coefficients in order - don't forget that we added the new state
     terminal_state_coefficients = [path_count_equation_coefficients[old_state + 1][0]
                                    for old_state in range(0, len(m)) if sum(m[old_state]) == 0]
 
     final_denominator = int(1 / reduce(gcd, terminal_state_coefficients))
 
-    final_numerators = map(
-        int, [coefficient * final_denominator for coefficient in terminal_state_coefficients])
+    final_numerators = list(map(
+        int, [coefficient * final_denominator for coefficient in terminal_state_coefficients]))
 
     return final_numerators + [final_denominator]
 
 
-print(solution(s))
+def sparse_rows(m):
+    """
+    the rows of the state matrix m as lists of (target state, weight) pairs,
+    the sparse form approximate_solution takes
+
+    >>> sparse_rows([[0, 2, 1], [0, 0, 0], [0, 0, 0]])
+    [[(1, 2), (2, 1)], [], []]
+    """
+    return [[(target, weight) for target, weight in enumerate(row) if weight] for row in m]
+
+
+def csr_transitions(rows):
+    """
+    Stores the transition probabilities of rows (one per state, each a dict
+    or a list of (target state, weight) pairs) in compressed sparse row
+    arrays: the transitions of state s are targets[row_starts[s]:row_starts[s + 1]]
+    with the matching probabilities. Self-loops are folded into the other
+    transitions of their state, since staying put any number of times doesn't
+    change where a state goes next; a state whose only transition is to
+    itself is left with none. Returns the arrays and the terminal states (the
+    ones without any transitions in rows).
+
+    >>> row_starts, targets, probabilities, terminal_states = csr_transitions([{0: 2, 1: 1, 2: 1}, [(3, 1)], [], []])
+    >>> list(row_starts), list(targets), list(probabilities), terminal_states
+    ([0, 2, 3, 3, 3], [1, 2, 3], [0.5, 0.5, 1.0], [2, 3])
+    """
+    row_starts = array.array('q', [0])
+    targets = array.array('q')
+    probabilities = array.array('d')
+    terminal_states = []
+
+    for state, row in enumerate(rows):
+        transitions = [(int(target), weight) for target, weight in (row.items() if isinstance(row, dict) else row)]
+        leaving_weight = sum(weight for target, weight in transitions if target != state)
+
+        if not any(weight for _, weight in transitions):
+            terminal_states.append(state)
+        elif leaving_weight:
+            for target, weight in transitions:
+                if target != state and weight:
+                    targets.append(target)
+                    probabilities.append(weight / leaving_weight)
+
+        row_starts.append(len(targets))
+
+    return row_starts, targets, probabilities, terminal_states
+
+
+def approximate_solution(rows, tolerance=1e-9, max_pushes=None):
+    """
+    Approximates the probability of ending in each terminal state from state
+    0, for chains far too big for the dense elimination of solution. rows
+    holds the transitions of each state sparsely (see csr_transitions and
+    sparse_rows), and memory use is linear in the number of transitions.
+
+    The iteration is a Gauss-Seidel sweep of v = e0 + vQ (v is the expected
+    number of visits to each transient state) done by pushing probability
+    mass: a state in the work queue passes its mass on along its transitions
+    at once, and the states it passes mass to join the queue. Mass reaching a
+    terminal state stays there. A state only joins the queue with more than
+    tolerance / states of mass, so once the queue is empty (or after
+    max_pushes pushes) the mass left in transient states is the only
+    probability not yet assigned.
+
+    Returns the probability of each terminal state (in state order) and an
+    error bound: the mass not yet absorbed plus a bound on the rounding
+    error, so each true probability is within error_bound of its estimate.
+
+    >>> s = [\
+        [0, 1, 0, 0, 0, 1],\
+        [4, 0, 0, 3, 2, 0],\
+        [0, 0, 0, 0, 0, 0],\
+        [0, 0, 0, 0, 0, 0],\
+        [0, 0, 0, 0, 0, 0],\
+        [0, 0, 0, 0, 0, 0]]
+    >>> probabilities, error_bound = approximate_solution(sparse_rows(s))
+    >>> [round(probability * 14, 6) for probability in probabilities], error_bound < 1e-9
+    ([0.0, 3.0, 2.0, 9.0], True)
+
+    >>> approximate_solution([[], [(0, 1)]])
+    ([1.0], 0.0)
+    """
+    row_starts, targets, probabilities, terminal_states = csr_transitions(rows)
+    states = len(rows)
+    if max_pushes is None:
+        max_pushes = 100 * (states + len(targets))
+
+    is_terminal = bytearray(states)
+    for state in terminal_states:
+        is_terminal[state] = 1
+
+    mass = array.array('d', bytes(8 * states))
+    mass[0] = 1.0
+    push_threshold = tolerance / states
+
+    queued = bytearray(states)
+    queue = collections.deque()
+    if row_starts[0] != row_starts[1]:
+        queue.append(0)
+        queued[0] = 1
+
+    pushes = 0
+    pushed_mass = 0.0
+    while queue and pushes < max_pushes:
+        state = queue.popleft()
+        queued[state] = 0
+
+        state_mass = mass[state]
+        mass[state] = 0.0
+        pushes += 1
+        pushed_mass += state_mass
+
+        for entry in range(row_starts[state], row_starts[state + 1]):
+            target = targets[entry]
+            mass[target] += state_mass * probabilities[entry]
+
+            # terminal states keep their mass, and states without transitions (other than to
+            # themselves) trap it, so neither is queued
+            if (not queued[target] and not is_terminal[target] and mass[target] > push_threshold
+                    and row_starts[target] != row_starts[target + 1]):
+                queued[target] = 1
+                queue.append(target)
+
+    stats = instrumentation.active()
+    if stats is not None:
+        stats.count('doomsday_fuel.pushes', pushes)
+
+    unabsorbed_mass = sum(mass[state] for state in range(states) if not is_terminal[state])
+    # every push rounds a product and a sum per transition, on probabilities that were rounded themselves
+    rounding_error = 4 * sys.float_info.epsilon * pushed_mass
+
+    return [mass[state] for state in terminal_states], unabsorbed_mass + rounding_error
+
+
+if __name__ == '__main__':
+    print(solution(s))
@@ -1,3 +1,27 @@
+import collections
+import functools
+import itertools
+import math
+import operator
+import timeit
+
+import autotune
+import instrumentation
+
+
+@functools.lru_cache(maxsize=None)
+def load_numpy():
+    """
+    NumPy if it is installed, otherwise None. It is imported on first use
+    rather than with this module, since importing it takes far longer than
+    importing everything else here.
+    """
+    try:
+        import numpy
+    except ImportError:
+        return None
+    return numpy
+
 
 def candidate_is_complete_solution(candidate):
     """
@@ -22,6 +46,63 @@ def extend_candidate(candidate, fix_cell_value):
     return (new_cell_data, cursor_position + 1, size)
 
 
+def rule_table_index(indicator, cell_below, cell_below_right, cell_right):
+    """
+    each argument is 0, 1 or -1 (the cell is outside the grid, or for
+    the indicator, the cell has no constraint)
+
+    >>> rule_table_index(-1, -1, -1, -1)
+    0
+    >>> rule_table_index(1, 1, 1, 1)
+    80
+    """
+    return 27 * (indicator + 1) + 9 * (cell_below + 1) + 3 * (cell_below_right + 1) + (cell_right + 1)
+
+
+def build_feasible_values_table():
+    """
+    tabulates the rules of nebula expansion: the entry at rule_table_index(...)
+    is a bitmask of the values the cell may take (bit v is set if v is allowed)
+
+    >>> table = build_feasible_values_table()
+    >>> table[rule_table_index(1, 0, 0, 0)], table[rule_table_index(1, 1, 0, 1)]
+    (2, 0)
+    >>> table[rule_table_index(0, 0, 1, 0)], table[rule_table_index(-1, -1, -1, 0)]
+    (2, 3)
+    """
+    table = bytearray(81)
+
+    for indicator, cell_below, cell_below_right, cell_right in itertools.product((-1, 0, 1), repeat=4):
+        neighbours_below_right = [cell_below, cell_below_right, cell_right]
+
+        live = neighbours_below_right.count(1)
+        dead = neighbours_below_right.count(0)
+
+        # the rules of nebula expansion
+        possible_cell_values = [0, 1]
+        if indicator == 0:
+            if dead == 2 and live == 1:
+                possible_cell_values = [1]
+            elif dead == 3:
+                possible_cell_values = [0]
+        elif indicator == 1:
+            if live > 1:
+                # infeasible
+                possible_cell_values = []
+            elif live == 1:
+                possible_cell_values = [0]
+            elif dead == 3:
+                possible_cell_values = [1]
+
+        table[rule_table_index(indicator, cell_below, cell_below_right, cell_right)] =\
+            sum(1 << value for value in possible_cell_values)
+
+    return table
+
+
+FEASIBLE_VALUES_TABLE = build_feasible_values_table()
+
+
 def compute_feasible_extensions(candidate, g):
     """
     In the test case below, the candidate partial solution has fixed
@@ -61,28 +142,11 @@ def compute_feasible_extensions(candidate, g):
         indicator = int(g[indicator_y_in_g][indicator_x_in_g])
         cell_below_right = cell_data >> (cursor - width - 1) & 1
 
-    neighbours_below_right = [cell_below, cell_below_right, cell_right]
-
-    live = neighbours_below_right.count(1)
-    dead = neighbours_below_right.count(0)
-
-    # the rules of nebula expansion
-    possible_cell_values = [0, 1]
-    if indicator == 0:
-        if dead == 2 and live == 1:
-            possible_cell_values = [1]
-        elif dead == 3:
-            possible_cell_values = [0]
-    elif indicator == 1:
-        if live > 1:
-            # infeasible
-            possible_cell_values = []
-        elif live == 1:
-            possible_cell_values = [0]
-        elif dead == 3:
-            possible_cell_values = [1]
+    allowed_values = FEASIBLE_VALUES_TABLE[
+        rule_table_index(indicator, cell_below, cell_below_right, cell_right)]
 
-    return [extend_candidate(candidate, fix_cell_value) for fix_cell_value in possible_cell_values]
+    return [extend_candidate(candidate, fix_cell_value) for fix_cell_value in (0, 1)
+            if allowed_values >> fix_cell_value & 1]
 
 
 def calculate_exposed_part(candidate):
@@ -102,11 +166,151 @@ def calculate_exposed_part(candidate):
     return cursor, cell_data | (1 << max(0, cursor - width - 1)) - 1
 
 
-def solution(g):
+def transpose(g):
+    """
+    >>> transpose([[True, False, True], [False, False, True]])
+    [[True, False], [False, False], [True, True]]
+    """
+    return [[g[x][y] for x in range(len(g))] for y in range(len(g[0]))]
+
+
+def estimated_row_sweep_cost(g):
+    """
+    Estimates how many partial solutions a search visits when it fixes the
+    predecessor of g one row at a time. A partial solution is identified by
+    its last (len(g[0]) + 1) cells, which bounds the number of distinct partial
+    solutions after each row. Of the 16 possible 2x2 blocks above a cell, 4
+    make it True and 12 make it False, so each row of g keeps roughly that
+    fraction of the extensions of every partial solution.
+
+    >>> estimated_row_sweep_cost([[False] * 8]) > estimated_row_sweep_cost([[False]] * 8)
+    True
+
+    >>> estimated_row_sweep_cost([[True] * 8] * 3) < estimated_row_sweep_cost([[False] * 8] * 3)
+    True
+    """
+    boundary_bits = len(g[0]) + 1
+    log_true_fraction, log_false_fraction = math.log(4 / 16.0, 2), math.log(12 / 16.0, 2)
+
+    log_states = boundary_bits
+    cost = 0.0
+    for row in g:
+        log_branching = boundary_bits + sum(log_true_fraction if cell else log_false_fraction for cell in row)
+        cost += 2 ** (log_states + max(0, log_branching))
+        log_states = max(0, min(boundary_bits, log_states + log_branching))
+
+    return cost
+
+
+# how many times cheaper estimated_row_sweep_cost has to expect the other orientation to be
+# before orient_for_row_sweep gives up the shorter rows; its estimates are often off by 4x
+ORIENTATION_MARGIN = 8.0
+
+
+def orient_for_row_sweep(g):
+    """
+    returns g or its transpose (which has the same number of predecessors),
+    whichever has the shorter rows (g's transpose if they are as long), unless
+    the cost model expects the other one to be more than ORIENTATION_MARGIN
+    times cheaper to search row by row
+
+    >>> orient_for_row_sweep([[True, False, True, False, False]])
+    [[True], [False], [True], [False], [False]]
+    >>> orient_for_row_sweep([[True], [False]])
+    [[True], [False]]
+    """
+    transposed_g = transpose(g)
+    if len(g[0]) >= len(g):
+        preferred_g, other_g = transposed_g, g
+    else:
+        preferred_g, other_g = g, transposed_g
+
+    if estimated_row_sweep_cost(other_g) * ORIENTATION_MARGIN < estimated_row_sweep_cost(preferred_g):
+        return other_g
+    else:
+        return preferred_g
+
+
+def canonical_grid_key(g):
+    """
+    The rules of nebula expansion are symmetric, so reflecting or rotating g
+    does not change its number of predecessors. This returns a key
+    (height, width, cells packed into an int) shared by all 8 reflections and
+    rotations of g.
+
+    >>> canonical_grid_key([[True, False], [False, False]])
+    (2, 2, 1)
+    >>> canonical_grid_key([[False, False], [False, True]])
+    (2, 2, 1)
+    """
+    keys = []
+    for reflected_g in (g, transpose(g)):
+        for rows in (reflected_g, reflected_g[::-1]):
+            for oriented_g in (rows, [row[::-1] for row in rows]):
+                cells = 0
+                for row in oriented_g:
+                    for cell in row:
+                        cells = cells << 1 | int(cell)
+
+                keys.append((len(oriented_g), len(oriented_g[0]), cells))
+
+    return min(keys)
+
+
+# results of planned_solution keyed on canonical_grid_key, least recently used first. The cache
+# lives as long as the process and holds at most SOLUTION_CACHE_SIZE grids; use result_cache for
+# results that should outlive it or be shared between processes
+SOLUTION_CACHE_SIZE = 1024
+solution_cache = collections.OrderedDict()
+
+
+def planned_solution(g):
+    """
+    Answers repeated (and reflected or rotated) grids from solution_cache,
+    and otherwise counts the predecessors with solution_in_place in the
+    orientation picked by orient_for_row_sweep. Once the cache is full, adding
+    a grid evicts the least recently used one.
+
+    This is an entry point of its own (expanding_nebula_planned in the solvers
+    registry), for streams of grids that repeat: solution never looks in the
+    cache, so callers that count each grid once don't pay for its keys.
+
+    >>> g2 = [[True, False, True, False, False, True, True, True],\
+        [True, False, True, False, False, False, True, False],\
+        [True, True, True, False, False, False, True, False],\
+        [True, False, True, False, False, False, True, False],\
+        [True, False, True, False, False, True, True, True]]
+    >>> planned_solution(g2)
+    254
+    >>> mirrored_g2 = [row[::-1] for row in g2]
+    >>> canonical_grid_key(mirrored_g2) in solution_cache
+    True
+    >>> planned_solution(mirrored_g2)
+    254
+    """
+    key = canonical_grid_key(g)
+
+    if key in solution_cache:
+        solution_cache.move_to_end(key)
+    else:
+        solution_cache[key] = solution_in_place(g)
+        if len(solution_cache) > SOLUTION_CACHE_SIZE:
+            solution_cache.popitem(last=False)
+
+    return solution_cache[key]
+
+
+def solution(g, engine=None):
     """
     This function implements a backtracking search of all possible
     nebulas in order to count the number of possible predecessors.
 
+    The engine can be selected: 'backtracking' (the search below),
+    'in_place' (solution_in_place) or 'columns' (count_predecessors, which
+    sweeps the grid a column at a time). By default autotune picks the
+    fastest for the number of cells in g. Grids that repeat, up to reflection
+    and rotation, are answered faster by planned_solution.
+
     A caching strategy is used to take advantage of the following property: for
     any two (partial) candidate solutions, if they differ only in cells that are
     before the last (width + 1) fixed cells, then the number of complete solutions
@@ -114,7 +318,7 @@ def solution(g):
     as the "exposed part" of this candidate.
 
     >>> g1 = [[True, False, True], [False, True, False], [True, False, True]]
-    >>> solution(g1)
+    >>> solution(g1, engine='backtracking')
     4
 
     >>> g2 = [[True, False, True, False, False, True, True, True],\
@@ -122,18 +326,29 @@ def solution(g):
         [True, True, True, False, False, False, True, False],\
         [True, False, True, False, False, False, True, False],\
         [True, False, True, False, False, True, True, True]]
-    >>> solution(g2)
+    >>> solution(g2, engine='backtracking')
     254
 
     >>> g3_encoded = 0x2a9047b452202091024a90660210f1aaa72801118021c950220c
     >>> g3 = [[g3_encoded >> 50 * y + x & 1 for x in range(50)] for y in range(9)]
-    >>> solution(g3)
+    >>> solution(g3, engine='backtracking')
+    403938963384122994507501793513203613645097539241313772075389745381953763
+    >>> solution(g3, engine='columns')
     403938963384122994507501793513203613645097539241313772075389745381953763
     """
+    if engine is None:
+        engine = autotune.choose_engine('expanding_nebula', g)
+    if engine == 'in_place':
+        return solution_in_place(g)
+    elif engine == 'columns':
+        columns, height = grid_columns(g)
+        return count_predecessors(columns, height, 1, dict())
+    elif engine != 'backtracking':
+        raise ValueError("unknown nebula engine " + repr(engine))
+
     # the caching strategy is most effective if
-    # there are more rows than columns
-    if len(g[0]) >= len(g):
-        g = [[g[x][y] for x in range(len(g))] for y in range(len(g[0]))]
+    # the rows are short (or very constrained)
+    g = orient_for_row_sweep(g)
 
     initial_candidate = (0, 0, (len(g[0]) + 1, len(g) + 1))
     candidate_stack = [(0, initial_candidate)]
@@ -141,6 +356,8 @@ def solution(g):
     candidate_exposed_cache = dict()
     number_of_descendant_solutions = dict()
     visited_parents = set()
+    stats = instrumentation.active()
+    cache_hits = 0
 
     while len(candidate_stack) > 0:
         (node_id, candidate) = candidate_stack[-1]
@@ -160,6 +377,8 @@ def solution(g):
             # cache hit (on this first visit)
             number_of_descendant_solutions[node_id] = candidate_exposed_cache[exposed_part]
             candidate_stack.pop()
+            if stats is not None:
+                cache_hits += 1
         elif candidate_is_complete_solution(candidate):
             number_of_descendant_solutions[node_id] = 1
             candidate_stack.pop()
@@ -172,9 +391,594 @@ def solution(g):
 
             visited_parents.add(node_id)
 
+    if stats is not None:
+        # every expanded candidate is stored in the cache when it is finished, so misses == entries
+        stats.count('expanding_nebula.cache_hits', cache_hits)
+        stats.count('expanding_nebula.cache_misses', len(candidate_exposed_cache))
+        stats.observe('expanding_nebula.cache_entries', len(candidate_exposed_cache))
+
     return number_of_descendant_solutions[0]
 
 
+def solution_in_place(g):
+    """
+    The same backtracking search as solution, except that there is a single
+    candidate which is updated in place: cells holds the fixed cells, options
+    holds the values still to try at each cursor position and the exposed part
+    of the candidate is kept as a rolling window of the last (width + 1) cells.
+    The rules of nebula expansion are looked up in FEASIBLE_VALUES_TABLE, so
+    fixing a cell does not build any lists or tuples.
+
+    >>> g1 = [[True, False, True], [False, True, False], [True, False, True]]
+    >>> solution_in_place(g1)
+    4
+
+    >>> g2 = [[True, False, True, False, False, True, True, True],\
+        [True, False, True, False, False, False, True, False],\
+        [True, True, True, False, False, False, True, False],\
+        [True, False, True, False, False, False, True, False],\
+        [True, False, True, False, False, True, True, True]]
+    >>> solution_in_place(g2)
+    254
+
+    >>> g3_encoded = 0x2a9047b452202091024a90660210f1aaa72801118021c950220c
+    >>> g3 = [[g3_encoded >> 50 * y + x & 1 for x in range(50)] for y in range(9)]
+    >>> solution_in_place(g3)
+    403938963384122994507501793513203613645097539241313772075389745381953763
+    """
+    g = orient_for_row_sweep(g)
+
+    width, height = len(g[0]) + 1, len(g) + 1
+    size = width * height
+
+    # cells hold (cell value + 1), and the extra slot at index size (which is
+    # always 0) stands in for any neighbour outside the grid
+    cells = bytearray(size + 1)
+    below_of, below_right_of, right_of = [size] * size, [size] * size, [size] * size
+    rule_base = [0] * size
+    for cursor in range(size):
+        indicator = -1
+        if cursor >= width:
+            below_of[cursor] = cursor - width
+        if cursor % width > 0:
+            right_of[cursor] = cursor - 1
+        if cursor >= width and cursor % width > 0:
+            below_right_of[cursor] = cursor - width - 1
+            indicator = int(g[(height - 1) - cursor // width][(width - 1) - cursor % width])
+
+        rule_base[cursor] = rule_table_index(indicator, -1, -1, -1)
+
+    options = bytearray(size)
+    windows = [0] * (size + 1)
+    totals = [0] * (size + 1)
+    exposed_caches = [dict() for _ in range(size + 1)]
+
+    cursor = 0
+    stats = instrumentation.active()
+    cache_hits = 0
+    options[0] = FEASIBLE_VALUES_TABLE[rule_base[0]]
+    while True:
+        allowed_values = options[cursor]
+
+        if allowed_values:
+            # fix the cell at the cursor to the next value left to try
+            value = (allowed_values & 1) ^ 1
+            options[cursor] = allowed_values ^ (1 << value)
+            cells[cursor] = value + 1
+            window = windows[cursor] >> 1 | value << width
+
+            if cursor + 1 == size:
+                totals[cursor] += 1
+                continue
+
+            cached_total = exposed_caches[cursor + 1].get(window)
+            if cached_total is not None:
+                totals[cursor] += cached_total
+                if stats is not None:
+                    cache_hits += 1
+                continue
+
+            cursor += 1
+            windows[cursor] = window
+            totals[cursor] = 0
+            options[cursor] = FEASIBLE_VALUES_TABLE[rule_base[cursor]
+                                                    + 9 * cells[below_of[cursor]]
+                                                    + 3 * cells[below_right_of[cursor]]
+                                                    + cells[right_of[cursor]]]
+        elif cursor == 0:
+            if stats is not None:
+                cache_entries = sum(len(exposed_cache) for exposed_cache in exposed_caches)
+                stats.count('expanding_nebula.cache_hits', cache_hits)
+                stats.count('expanding_nebula.cache_misses', cache_entries)
+                stats.observe('expanding_nebula.cache_entries', cache_entries)
+
+            return totals[0]
+        else:
+            # every extension has been counted - backtrack
+            exposed_caches[cursor][windows[cursor]] = totals[cursor]
+            totals[cursor - 1] += totals[cursor]
+            cursor -= 1
+
+
+def grid_columns(g):
+    """
+    encodes g as a list of column bitmasks (bit y of a column holds row y),
+    transposing first if the cost model prefers to sweep the other way
+
+    >>> grid_columns([[True, False, True], [False, True, False]])
+    ([1, 2, 1], 2)
+    """
+    g = transpose(orient_for_row_sweep(g))
+
+    columns = [sum(int(g[y][x]) << y for y in range(len(g))) for x in range(len(g[0]))]
+    return columns, len(g)
+
+
+def column_transitions(left, target, height, transitions_cache):
+    """
+    returns every column that can sit to the right of the column `left`
+    (height + 1 cells) so that the two columns evolve into the column `target`
+    (height cells). The table is memoized in transitions_cache, so any two
+    partial solutions sharing the same boundary column share the work.
+
+    >>> sorted(column_transitions(0b00, 0b1, 1, {}))
+    [1, 2]
+
+    >>> column_transitions(0b11, 0b1, 1, {})
+    []
+    """
+    key = (height, left, target)
+    right_columns = transitions_cache.get(key)
+
+    if right_columns is None:
+        # fix the cells of the right column from the top down - each cell of
+        # target only depends on the 2x2 block of cells above-left of it
+        right_columns = [0, 1]
+        for y in range(height):
+            left_live = (left >> y & 1) + (left >> y + 1 & 1)
+            wanted = target >> y & 1
+
+            extended_columns = []
+            for partial_column in right_columns:
+                live = left_live + (partial_column >> y & 1)
+                for bit in (0, 1):
+                    if (live + bit == 1) == wanted:
+                        extended_columns.append(partial_column | bit << y + 1)
+
+            right_columns = extended_columns
+
+        transitions_cache[key] = right_columns
+
+    return right_columns
+
+
+def extend_boundary_state(state, step, columns, height, transitions_cache):
+    """
+    A boundary state holds the newest column of each earlier generation
+    (the previous generation first), or None for generations that have
+    not started yet. Generation i starts i columns before g does, since
+    every generation back is one column wider.
+
+    >>> sorted(extend_boundary_state((0b00,), 0, [0b1], 1, {}))
+    [(1,), (2,)]
+    """
+    partial_states = [()]
+    for generation in range(1, len(state) + 1):
+        column_index = step + generation
+
+        extended_states = []
+        for partial_state in partial_states:
+            if column_index < 0:
+                new_columns = [None]
+            elif column_index == 0:
+                # the first column of a generation is unconstrained
+                new_columns = range(1 << height + generation)
+            else:
+                target = columns[step] if generation == 1 else partial_state[-1]
+                new_columns = column_transitions(
+                    state[generation - 1], target, height + generation - 1, transitions_cache)
+
+            extended_states += [partial_state + (new_column,) for new_column in new_columns]
+
+        partial_states = extended_states
+
+    return partial_states
+
+
+def count_predecessors(columns, height, generations, transitions_cache, one=1, zero=0, add=operator.add):
+    """
+    counts the grids `generations` steps back that evolve into the grid with
+    the given column bitmasks, sweeping one column at a time and merging
+    partial solutions that share the same boundary state
+
+    The weight of a single partial solution is `one` and merged weights are
+    combined with `add`, so the counts can be kept as exact integers,
+    residues or logarithms.
+
+    >>> count_predecessors([0b101, 0b010, 0b101], 3, 1, {})
+    4
+
+    >>> count_predecessors([0b101, 0b010, 0b101], 3, 1, {}, add=lambda a, b: (a + b) % 3)
+    1
+    """
+    states = {(None,) * generations: one}
+
+    for step in range(-generations, len(columns)):
+        next_states = dict()
+        for state, weight in states.items():
+            for next_state in extend_boundary_state(state, step, columns, height, transitions_cache):
+                if next_state in next_states:
+                    next_states[next_state] = add(next_states[next_state], weight)
+                else:
+                    next_states[next_state] = weight
+
+        states = next_states
+
+    return functools.reduce(add, states.values(), zero)
+
+
+def chinese_remainder(residues, moduli):
+    """
+    returns the unique x modulo the product of the (pairwise coprime)
+    moduli with x == residues[i] modulo moduli[i]
+
+    >>> chinese_remainder([2, 3, 2], [3, 5, 7])
+    23
+    """
+    x, product = 0, 1
+    for residue, modulus in zip(residues, moduli):
+        # lift x (correct modulo product) to be correct modulo product * modulus too
+        x += product * ((residue - x) * pow(product, -1, modulus) % modulus)
+        product *= modulus
+
+    return x
+
+
+# height: NumPy arrays (pairs, starts) listing every pair of predecessor columns by the column they evolve into
+evolution_tables = dict()
+
+# the largest height with an evolution table: it holds 4 ** (height + 1) pairs
+EVOLUTION_TABLE_MAX_HEIGHT = 10
+
+
+def evolution_table(height, numpy):
+    """
+    For every pair of (height + 1)-cell columns (left, right), the height-cell
+    column they evolve into, computed for all pairs at once. Returns the
+    pairs (left << height + 1 | right) sorted by that column, and the start of
+    each column's pairs: the pairs evolving into target are
+    pairs[starts[target]:starts[target + 1]].
+    """
+    if height not in evolution_tables:
+        states = 1 << height + 1
+        lefts = numpy.arange(states, dtype=numpy.int32)[:, None]
+        rights = numpy.arange(states, dtype=numpy.int32)[None, :]
+
+        evolved = numpy.zeros((states, states), dtype=numpy.int32)
+        for y in range(height):
+            live = (lefts >> y & 1) + (lefts >> y + 1 & 1) + (rights >> y & 1) + (rights >> y + 1 & 1)
+            evolved |= (live == 1).astype(numpy.int32) << y
+
+        pairs = numpy.argsort(evolved.ravel(), kind='stable')
+        starts = numpy.searchsorted(evolved.ravel()[pairs], numpy.arange((1 << height) + 1))
+        evolution_tables[height] = (pairs, starts)
+
+    return evolution_tables[height]
+
+
+def column_transfer(target, height, numpy):
+    """
+    every (left, right) pair of columns with right in column_transitions(left,
+    target), as NumPy arrays of lefts and of rights
+    """
+    pairs, starts = evolution_table(height, numpy)
+    target_pairs = pairs[starts[target]:starts[target + 1]]
+    return target_pairs >> height + 1, target_pairs & (1 << height + 1) - 1
+
+
+def modular_column_count(columns, height, modulus, transitions_cache):
+    """
+    count_predecessors(columns, height, 1, ...) modulo modulus, keeping one
+    residue per predecessor column in a vector that is reduced after every
+    column. With NumPy (for heights with an evolution_table, and moduli small
+    enough for the sums of a column to stay exact in a float64) each column
+    is one gather and one bincount. Otherwise the residues are plain ints and
+    columns with a zero residue are skipped, since they add nothing.
+
+    >>> modular_column_count([0b101, 0b010, 0b101], 3, 3, {})
+    1
+    >>> modular_column_count([0b101, 0b010, 0b101], 3, 1000, {})
+    4
+    """
+    states = 1 << height + 1
+    numpy = load_numpy() if height <= EVOLUTION_TABLE_MAX_HEIGHT else None
+
+    if numpy is not None and modulus * states < 1 << 53:
+        counts = numpy.full(states, 1 % modulus, dtype=numpy.float64)
+        for target in columns:
+            lefts, rights = column_transfer(target, height, numpy)
+            counts = numpy.bincount(rights, weights=counts[lefts], minlength=states) % modulus
+        return int(counts.sum()) % modulus
+
+    counts = [1 % modulus] * states
+    for target in columns:
+        next_counts = [0] * states
+        for left, count in enumerate(counts):
+            if count:
+                for right in column_transitions(left, target, height, transitions_cache):
+                    next_counts[right] += count
+        counts = [count % modulus for count in next_counts]
+
+    return sum(counts) % modulus
+
+
+def log_column_count(columns, height, transitions_cache):
+    """
+    The natural logarithm of count_predecessors(columns, height, 1, ...),
+    sweeping a vector of float counts that is rescaled to a maximum of 1
+    after every column (the logarithms of the scale factors are summed), so
+    it never overflows. Uses NumPy like modular_column_count.
+
+    >>> round(log_column_count([0b101, 0b010, 0b101], 3, {}), 9) == round(math.log(4), 9)
+    True
+    """
+    states = 1 << height + 1
+    numpy = load_numpy() if height <= EVOLUTION_TABLE_MAX_HEIGHT else None
+    log_scale = 0.0
+
+    if numpy is not None:
+        counts = numpy.ones(states)
+        for target in columns:
+            lefts, rights = column_transfer(target, height, numpy)
+            counts = numpy.bincount(rights, weights=counts[lefts], minlength=states)
+            scale = counts.max()
+            if scale == 0:
+                return -math.inf
+            counts /= scale
+            log_scale += math.log(scale)
+        return log_scale + math.log(counts.sum())
+
+    counts = [1.0] * states
+    for target in columns:
+        next_counts = [0.0] * states
+        for left, count in enumerate(counts):
+            if count:
+                for right in column_transitions(left, target, height, transitions_cache):
+                    next_counts[right] += count
+
+        scale = max(next_counts)
+        if scale == 0:
+            return -math.inf
+        counts = [count / scale for count in next_counts]
+        log_scale += math.log(scale)
+
+    return log_scale + math.log(sum(counts))
+
+
+def modular_solution(g, moduli, generations=1, reconstruct=False):
+    """
+    Counts the predecessors of g modulo each of `moduli` without ever building
+    the (enormous) exact count: every boundary state only carries one word-sized
+    residue per modulus. With reconstruct=True the residues are combined with
+    the Chinese remainder theorem, which gives the exact count whenever the
+    product of the (pairwise coprime) moduli exceeds it.
+
+    >>> g2 = [[True, False, True, False, False, True, True, True],\
+        [True, False, True, False, False, False, True, False],\
+        [True, True, True, False, False, False, True, False],\
+        [True, False, True, False, False, False, True, False],\
+        [True, False, True, False, False, True, True, True]]
+    >>> modular_solution(g2, [2, 3, 1000003])
+    [0, 2, 254]
+
+    >>> g3_encoded = 0x2a9047b452202091024a90660210f1aaa72801118021c950220c
+    >>> g3 = [[g3_encoded >> 50 * y + x & 1 for x in range(50)] for y in range(9)]
+    >>> modular_solution(g3, [2 ** 64 - 59, 2 ** 63 - 25, 2 ** 62 - 57, 2 ** 61 - 1], reconstruct=True)
+    403938963384122994507501793513203613645097539241313772075389745381953763
+    >>> modular_solution(g2, [2, 3, 1000003], generations=2) == [count % m for m in (2, 3, 1000003)\
+        for count in [count for count, _ in multi_generation_solution(g2, 2)][1:]]
+    True
+    """
+    columns, height = grid_columns(g)
+
+    if generations == 1:
+        # one residue vector per modulus, sharing the column transitions
+        transitions_cache = dict()
+        residues = [modular_column_count(columns, height, modulus, transitions_cache) for modulus in moduli]
+    else:
+        def add_residues(a, b):
+            return tuple((x + y) % modulus for x, y, modulus in zip(a, b, moduli))
+
+        residues = count_predecessors(columns, height, generations, dict(),
+                                      one=tuple(1 % modulus for modulus in moduli),
+                                      zero=(0,) * len(moduli),
+                                      add=add_residues)
+
+    return chinese_remainder(residues, moduli) if reconstruct else list(residues)
+
+
+def log_solution(g, generations=1):
+    """
+    Approximates the natural logarithm of the number of predecessors of g,
+    carrying logarithms of the counts through the sweep instead of exact
+    integers. Returns -inf when g has no predecessors.
+
+    >>> g1 = [[True, False, True], [False, True, False], [True, False, True]]
+    >>> round(log_solution(g1), 9) == round(math.log(4), 9)
+    True
+
+    >>> g3_encoded = 0x2a9047b452202091024a90660210f1aaa72801118021c950220c
+    >>> g3 = [[g3_encoded >> 50 * y + x & 1 for x in range(50)] for y in range(9)]
+    >>> round(log_solution(g3) / math.log(10), 6)
+    71.606316
+    """
+    columns, height = grid_columns(g)
+
+    if generations == 1:
+        return log_column_count(columns, height, dict())
+
+    def add_logarithms(a, b):
+        if a < b:
+            a, b = b, a
+        return a if b == -math.inf else a + math.log1p(math.exp(b - a))
+
+    return count_predecessors(columns, height, generations, dict(),
+                              one=0.0, zero=-math.inf, add=add_logarithms)
+
+
+def multi_generation_solution(g, generations):
+    """
+    Counts the possible states of the nebula 1, 2, ..., `generations` steps
+    before g. All the generations share one column transition table, which
+    is what makes going back more than one step feasible - enumerating the
+    predecessors of every predecessor is hopeless. Returns a list of
+    (count, seconds) pairs, one per generation.
+
+    >>> g1 = [[True, False, True], [False, True, False], [True, False, True]]
+    >>> [count for count, _ in multi_generation_solution(g1, 2)]
+    [4, 4692]
+
+    >>> g2 = [[True, False, True, False, False, True, True, True],\
+        [True, False, True, False, False, False, True, False],\
+        [True, True, True, False, False, False, True, False],\
+        [True, False, True, False, False, False, True, False],\
+        [True, False, True, False, False, True, True, True]]
+    >>> [count for count, _ in multi_generation_solution(g2, 1)]
+    [254]
+    """
+    columns, height = grid_columns(g)
+    transitions_cache = dict()
+
+    counts_and_timings = []
+    for generation in range(1, generations + 1):
+        start_time = timeit.default_timer()
+        count = count_predecessors(columns, height, generation, transitions_cache)
+        counts_and_timings.append((count, timeit.default_timer() - start_time))
+
+    return counts_and_timings
+
+
+class PredecessorCounter:
+    """
+    Keeps the number of predecessors of a grid up to date while its cells
+    change one at a time. The predecessor is swept a column at a time (along
+    the longer side of the grid) as in count_predecessors, and the counter
+    keeps both sweeps: forward[x] maps each predecessor column x to the number
+    of ways to fill the columns before it consistently with the grid columns
+    before x, and backward[x] maps it to the number of ways to fill the
+    columns after it consistently with the grid columns from x on. Grid
+    column x only enters the transfer between predecessor columns x and
+    x + 1, so the count is
+
+        sum of forward[x][a] * backward[x + 1][b] over b in column_transitions(a, column x)
+
+    for any x. Changing a cell in column x only invalidates the forward
+    vectors after x and the backward vectors up to x. The count is taken
+    around the last changed column, so repeated changes to one column only
+    redo that column's transfer, and a change elsewhere also redoes the
+    vectors between the two columns.
+
+    >>> g1 = [[True, False, True], [False, True, False], [True, False, True]]
+    >>> counter = PredecessorCounter(g1)
+    >>> counter.count()
+    4
+    >>> counter.set_cell(1, 1, False)
+    12
+    >>> counter.set_cell(0, 1, True)
+    10
+    >>> counter.count() == solution([[True, True, True], [False, False, False], [True, False, True]], engine='in_place')
+    True
+    """
+    def __init__(self, g):
+        # columns run along the longer side, so there are at most 2 ** (shorter side + 1) predecessor columns
+        self.transposed = len(g) > len(g[0])
+        if self.transposed:
+            g = transpose(g)
+
+        self.height = len(g)
+        self.columns = [sum(int(g[y][x]) << y for y in range(self.height)) for x in range(len(g[0]))]
+        self.transitions_cache = dict()
+
+        width = len(self.columns)
+        every_column = dict.fromkeys(range(1 << self.height + 1), 1)
+        self.forward = [every_column] + [None] * width
+        self.backward = [None] * width + [every_column]
+        # forward[:forward_valid + 1] and backward[backward_valid:] are up to date
+        self.forward_valid = 0
+        self.backward_valid = width
+        self.focus = 0
+        self.cached_count = None
+
+    def forward_vector(self, x):
+        while self.forward_valid < x:
+            vector = dict()
+            for left, ways in self.forward[self.forward_valid].items():
+                for right in column_transitions(left, self.columns[self.forward_valid], self.height,
+                                                self.transitions_cache):
+                    vector[right] = vector.get(right, 0) + ways
+
+            self.forward_valid += 1
+            self.forward[self.forward_valid] = vector
+            self.count_column_transfer()
+
+        return self.forward[x]
+
+    def backward_vector(self, x):
+        while self.backward_valid > x:
+            self.backward_valid -= 1
+            following = self.backward[self.backward_valid + 1]
+            vector = dict()
+            for left in range(1 << self.height + 1):
+                ways = sum(following.get(right, 0) for right in column_transitions(
+                    left, self.columns[self.backward_valid], self.height, self.transitions_cache))
+                if ways:
+                    vector[left] = ways
+
+            self.backward[self.backward_valid] = vector
+            self.count_column_transfer()
+
+        return self.backward[x]
+
+    def count_column_transfer(self):
+        stats = instrumentation.active()
+        if stats is not None:
+            stats.count('expanding_nebula.column_transfers')
+
+    def count(self):
+        """
+        the number of predecessors of the grid as it is now
+        """
+        if self.cached_count is None:
+            x = self.focus
+            forward, backward = self.forward_vector(x), self.backward_vector(x + 1)
+
+            self.cached_count = 0
+            for left, ways in forward.items():
+                for right in column_transitions(left, self.columns[x], self.height, self.transitions_cache):
+                    self.cached_count += ways * backward.get(right, 0)
+            self.count_column_transfer()
+
+        return self.cached_count
+
+    def set_cell(self, y, x, value):
+        """
+        sets the cell in row y and column x of the grid and returns the new
+        number of predecessors
+        """
+        if self.transposed:
+            y, x = x, y
+
+        column = self.columns[x] & ~(1 << y) | int(value) << y
+        if column != self.columns[x]:
+            self.columns[x] = column
+            self.forward_valid = min(self.forward_valid, x)
+            self.backward_valid = max(self.backward_valid, x + 1)
+            self.focus = x
+            self.cached_count = None
+
+        return self.count()
+
+
 def __main__():
     # expect 4
     test_g1 = [[True, False, True], [False, True, False], [True, False, True]]
@@ -202,4 +1006,5 @@ def __main__():
     # print(solution(test_gi))
 
 
-__main__()
+if __name__ == '__main__':
+    __main__()
@@ -70,15 +70,15 @@ def solution(n):
 
             if last_run_char == '0':
                 # all zeroes so half the number last_run_count times (last_run_count operations)
-                return last_run_count + quantum_pellet_operations(n_as_int / (2 ** last_run_count))
+                return last_run_count + quantum_pellet_operations(n_as_int // (2 ** last_run_count))
 
             elif last_run_count >= 2:
                 # a run of 1s of length two or more, so add one then half the number
                 # last_run_count times (1 + last_run_count operations)
-                return 1 + last_run_count + quantum_pellet_operations(1 + (n_as_int / (2 ** last_run_count)))
+                return 1 + last_run_count + quantum_pellet_operations(1 + (n_as_int // (2 ** last_run_count)))
 
             else:
                 # a single run of "1", subtract one and then half (2 operations)
-                return 2 + quantum_pellet_operations((n_as_int - 1) / 2)
+                return 2 + quantum_pellet_operations((n_as_int - 1) // 2)
 
     return quantum_pellet_operations(int(n))
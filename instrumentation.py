@@ -0,0 +1,166 @@
+"""
+Named counters, timers and high-water marks for the hot paths of the solvers.
+
+Nothing is recorded unless a call runs inside collecting(); otherwise the
+hooks in the solvers cost one active() lookup per call plus a None check.
+
+>>> import running_with_bunnies
+>>> with collecting() as stats:
+...     running_with_bunnies.solution([[0, 1, 1], [1, 0, 1], [1, 1, 0]], 3, engine='permutations')
+[0]
+>>> stats.counters['running_with_bunnies.permutations']
+1
+"""
+import contextlib
+import re
+import threading
+import timeit
+
+state = threading.local()
+
+
+class Stats(object):
+    """
+    The counters, timers (total seconds) and high-water marks recorded
+    during one collecting() block.
+
+    >>> stats = Stats()
+    >>> stats.count('cache_hits', 3)
+    >>> stats.observe('stack_depth', 7)
+    >>> stats.observe('stack_depth', 5)
+    >>> stats.as_dict()
+    {'counters': {'cache_hits': 3}, 'timers': {}, 'high_water_marks': {'stack_depth': 7}}
+    """
+
+    def __init__(self):
+        self.counters = dict()
+        self.timers = dict()
+        self.high_water_marks = dict()
+
+    def count(self, name, amount=1):
+        self.counters[name] = self.counters.get(name, 0) + amount
+
+    def add_time(self, name, seconds):
+        self.timers[name] = self.timers.get(name, 0.0) + seconds
+
+    def observe(self, name, value):
+        if value > self.high_water_marks.get(name, value - 1):
+            self.high_water_marks[name] = value
+
+    def merge(self, other):
+        """
+        adds the counters and timers of other into this object and keeps the
+        higher of each pair of high-water marks
+        """
+        for name, amount in other.counters.items():
+            self.count(name, amount)
+        for name, seconds in other.timers.items():
+            self.add_time(name, seconds)
+        for name, value in other.high_water_marks.items():
+            self.observe(name, value)
+
+    def as_dict(self):
+        return {'counters': dict(self.counters), 'timers': dict(self.timers),
+                'high_water_marks': dict(self.high_water_marks)}
+
+    def prometheus_text(self, prefix='foobar'):
+        """
+        The stats in the Prometheus text exposition format: counters as
+        <name>_total, timers as <name>_seconds_total and high-water marks as
+        <name>_max gauges.
+
+        >>> stats = Stats()
+        >>> stats.count('expanding_nebula.cache_hits', 2)
+        >>> stats.add_time('doomsday_fuel.elimination', 0.5)
+        >>> print(stats.prometheus_text())
+        # TYPE foobar_expanding_nebula_cache_hits_total counter
+        foobar_expanding_nebula_cache_hits_total 2
+        # TYPE foobar_doomsday_fuel_elimination_seconds_total counter
+        foobar_doomsday_fuel_elimination_seconds_total 0.5
+        <BLANKLINE>
+        """
+        lines = []
+        for metrics, suffix, metric_type in ((self.counters, '_total', 'counter'),
+                                             (self.timers, '_seconds_total', 'counter'),
+                                             (self.high_water_marks, '_max', 'gauge')):
+            for name in metrics:
+                metric_name = prefix + '_' + re.sub('[^a-zA-Z0-9_]', '_', name) + suffix
+                lines.append('# TYPE {} {}'.format(metric_name, metric_type))
+                lines.append('{} {}'.format(metric_name, metrics[name]))
+
+        return ''.join(line + '\n' for line in lines)
+
+
+def active():
+    """
+    the Stats being collected on this thread, or None when instrumentation is off
+    """
+    return getattr(state, 'stats', None)
+
+
+@contextlib.contextmanager
+def collecting(stats=None):
+    """
+    Records the instrumentation of everything called inside the block (on
+    this thread) into stats, a new Stats object by default. Blocks can be
+    nested; the inner one gets the calls made inside it.
+    """
+    stats = Stats() if stats is None else stats
+    previous = active()
+    state.stats = stats
+    try:
+        yield stats
+    finally:
+        state.stats = previous
+
+
+class Timer(object):
+    def __init__(self, stats, name):
+        self.stats = stats
+        self.name = name
+
+    def __enter__(self):
+        self.start = timeit.default_timer()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stats.add_time(self.name, timeit.default_timer() - self.start)
+        return False
+
+
+class NullTimer(object):
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+NULL_TIMER = NullTimer()
+
+
+def timed(name):
+    """
+    A context manager adding the time spent inside it to the timer name, or
+    a shared do-nothing one when instrumentation is off.
+
+    >>> with timed('not collected'):
+    ...     pass
+    >>> with collecting() as stats:
+    ...     with timed('collected'):
+    ...         pass
+    >>> list(stats.timers)
+    ['collected']
+    """
+    stats = active()
+    return NULL_TIMER if stats is None else Timer(stats, name)
+
+
+def collect(function, *args, **kwargs):
+    """
+    function(*args, **kwargs) run inside collecting(), returned together with
+    its Stats
+    """
+    with collecting() as stats:
+        result = function(*args, **kwargs)
+    return result, stats
@@ -1,15 +1,501 @@
 import base64
+import binascii
+import collections
+import functools
+import io
+import math
+import sys
+
 encrypted = b"Fk4YEA4ADhIKFRIKE0oOGQAMF0xNWRVRX18BDAoCGAZMQUMSFVVAGQwOCAgHTE1ZFVdWVQIbHxZK Q1FBXltcU0EIDQIHAQZMTVkVU1NbBAwdAAAGBRVeEggQFBgHBwoOCA4FXh4SF0EMCwkMGRBMQUMS FUNSCwxMSU1EDQ4WFRIKE0oeAgtMRBY="
 username = b"mikemckay2203"
 
-# FRIKE appears twice... what does this mean
-bde = base64.b64decode(encrypted)
-print(bde)
-username_repeated = int.from_bytes(username * 30, byteorder='little')
+BASE64_WHITESPACE = b" \t\r\n\v\f"
+
+# rough relative frequencies of bytes in English text; uppercase letters get a tenth of their lowercase weight
+ENGLISH_FREQUENCIES = {
+    b" ": 18.0, b"e": 10.2, b"t": 7.5, b"a": 6.5, b"o": 6.2, b"i": 5.7, b"n": 5.7, b"s": 5.3, b"r": 5.0,
+    b"h": 4.9, b"l": 3.3, b"d": 3.4, b"u": 2.3, b"c": 2.2, b"m": 2.0, b"f": 1.8, b"w": 1.7, b"g": 1.6,
+    b"y": 1.4, b"p": 1.5, b"b": 1.3, b"v": 0.8, b"k": 0.6, b"j": 0.1, b"x": 0.1, b"q": 0.1, b"z": 0.1,
+}
+PUNCTUATION_FREQUENCY = 0.3
+UNPRINTABLE_FREQUENCY = 0.0001
+
+
+@functools.lru_cache(maxsize=None)
+def load_numpy():
+    """
+    NumPy, or None if it is not installed, imported on first use: decoding
+    the short message does not need it, and importing it costs more than the
+    decoding does.
+    """
+    try:
+        import numpy
+    except ImportError:
+        return None
+    return numpy
+
+
+def iter_base64_chunks(source, chunk_size=1 << 16):
+    """
+    Decodes base64 read from the binary file source chunk_size bytes at a time,
+    yielding the decoded bytes of each chunk. Whitespace (line breaks included)
+    is skipped; characters that don't complete a 4-character group are carried
+    over to the next chunk, so memory use doesn't depend on the input size.
+
+    >>> list(iter_base64_chunks(io.BytesIO(b"aGVs bG8g\\nd29y bGQ="), chunk_size=3))
+    [b'hel', b'lo ', b'wor', b'ld']
+    """
+    carry = b""
+
+    while True:
+        chunk = source.read(chunk_size)
+
+        if not chunk:
+            break
+
+        chunk = carry + chunk.translate(None, BASE64_WHITESPACE)
+        complete = len(chunk) - len(chunk) % 4
+        carry = chunk[complete:]
+
+        if complete:
+            yield binascii.a2b_base64(chunk[:complete])
+
+    if carry:
+        # raises binascii.Error for a truncated final group
+        yield binascii.a2b_base64(carry)
+
+
+def repeating_key_tile(key, length):
+    """
+    The key repeated to cover length bytes starting at any offset into the key,
+    so each chunk can be XORed against a slice of it instead of a fresh copy.
+
+    >>> repeating_key_tile(b"abc", 4)
+    b'abcabcabc'
+    """
+    return key * (length // len(key) + 2)
+
+
+def xor_into(out, chunk, key_tile, offset):
+    """
+    Writes chunk XOR key_tile[offset:offset + len(chunk)] into the writable
+    buffer out (at least len(chunk) long) and returns a memoryview of the
+    written part. Uses NumPy on views of the buffers when it is available.
+
+    >>> out = bytearray(8)
+    >>> bytes(xor_into(out, b"\\x00\\x01\\x02", b"abcabc", 1))
+    b'bbc'
+    """
+    size = len(chunk)
+    window = memoryview(key_tile)[offset:offset + size]
+    written = memoryview(out)[:size]
+
+    numpy = load_numpy()
+    if numpy is not None:
+        numpy.bitwise_xor(numpy.frombuffer(chunk, numpy.uint8), numpy.frombuffer(window, numpy.uint8),
+                          out=numpy.frombuffer(written, numpy.uint8))
+    else:
+        written[:] = (int.from_bytes(chunk, 'little') ^ int.from_bytes(window, 'little')).to_bytes(size, 'little')
+
+    return written
+
+
+def decode_stream(source, sink, key, chunk_size=1 << 16):
+    """
+    Streams base64 from the binary file source, XORs it against the repeating
+    key and writes the plaintext to the binary file sink as it goes. Returns the
+    number of plaintext bytes written. Works for messages of any length (the
+    key position carries across chunks) in memory bounded by chunk_size.
+
+    >>> sink = io.BytesIO()
+    >>> decode_stream(io.BytesIO(encrypted), sink, username, chunk_size=7)
+    137
+    >>> sink.getvalue() == decode(encrypted, username)
+    True
+    """
+    # a chunk of chunk_size base64 characters plus a carried partial group decodes to at most this many bytes
+    max_decoded = (chunk_size + 3) // 4 * 3 + 3
+    key_tile = repeating_key_tile(key, max_decoded)
+    out = bytearray(max_decoded)
+    written = 0
+
+    for chunk in iter_base64_chunks(source, chunk_size):
+        sink.write(xor_into(out, chunk, key_tile, written % len(key)))
+        written += len(chunk)
+
+    return written
+
+
+def decode(encrypted, key):
+    """
+    Decodes a whole base64 message held in memory.
+
+    >>> decode(encrypted, username)[:33]
+    b"{'success' : 'great', 'colleague'"
+    """
+    sink = io.BytesIO()
+    decode_stream(io.BytesIO(encrypted), sink, key)
+    return sink.getvalue()
+
+
+def english_log_weights():
+    """
+    Log-frequency score of each byte value as a byte of English text: letters
+    by their frequency, digits and punctuation a little, line breaks and tabs
+    like punctuation, and everything unprintable almost never.
+
+    >>> weights = english_log_weights()
+    >>> weights[ord("e")] > weights[ord("E")] > weights[ord("!")] > weights[0]
+    True
+    """
+    frequencies = [UNPRINTABLE_FREQUENCY] * 256
+
+    for value in range(32, 127):
+        frequencies[value] = PUNCTUATION_FREQUENCY
+    for value in b"\t\n\r":
+        frequencies[value] = PUNCTUATION_FREQUENCY
+
+    for letter, frequency in ENGLISH_FREQUENCIES.items():
+        frequencies[letter[0]] = frequency
+        if letter.isalpha():
+            frequencies[letter.upper()[0]] = frequency / 10
+
+    total = sum(frequencies)
+    return [math.log(frequency / total) for frequency in frequencies]
+
+
+ENGLISH_LOG_WEIGHTS = english_log_weights()
+
+
+def column_byte_counts(ciphertext, key_length):
+    """
+    How often each byte value occurs in each of the key_length columns of the
+    ciphertext (column i holds the bytes XORed with key byte i). With NumPy
+    this is a single bincount with each column's bytes offset into their own
+    block of 256 bins, giving a key_length x 256 array; without it, a list of
+    lists.
+
+    >>> [[int(count) for count in row[97:100]] for row in column_byte_counts(b"abcabcab", 2)]
+    [[2, 1, 1], [1, 2, 1]]
+    """
+    numpy = load_numpy()
+    if numpy is None:
+        counts = []
+        for column in range(key_length):
+            column_counts = collections.Counter(ciphertext[column::key_length])
+            counts.append([column_counts[value] for value in range(256)])
+        return counts
+
+    data = numpy.frombuffer(ciphertext, numpy.uint8)
+    bins = numpy.arange(len(data)) % key_length * 256 + data
+    return numpy.bincount(bins, minlength=256 * key_length).reshape(key_length, 256)
+
+
+def coincidence_rates(ciphertext, max_shift):
+    """
+    For each shift 1..max_shift, the fraction of positions i where byte i
+    equals byte i + shift. XOR with the same key byte keeps equal plaintext
+    bytes equal, so at multiples of the key length this is English's index of
+    coincidence (~0.07), while other shifts pair different key bytes and look
+    close to uniform. With NumPy every shift is compared at once through a
+    strided sliding-window view of the buffer.
+
+    >>> [round(rate, 6) for rate in coincidence_rates(b"abcabcabcabc", 4)]
+    [0.0, 0.0, 1.0, 0.0]
+    """
+    compared = len(ciphertext) - max_shift
+
+    numpy = load_numpy()
+    if numpy is None:
+        return [sum(a == b for a, b in zip(ciphertext[:compared], ciphertext[shift:])) / compared
+                for shift in range(1, max_shift + 1)]
+
+    windows = numpy.lib.stride_tricks.sliding_window_view(numpy.frombuffer(ciphertext, numpy.uint8), max_shift + 1)
+    return (windows[:, 1:] == windows[:, :1]).mean(axis=0).tolist()
+
+
+def estimate_key_length(ciphertext, max_key_length=40, tolerance=0.8):
+    """
+    The shortest shift whose coincidence rate is within tolerance of the best
+    among 1..max_key_length (capped at half the ciphertext). Multiples of the
+    real key length score as well as the real length does, so taking the
+    shortest usually lands on it; on short messages noise can still pick a
+    multiple, which shortest_key then reduces.
+
+    >>> plaintext = b"It was the best of times, it was the worst of times, it was the age of wisdom, " * 3
+    >>> estimate_key_length(bytes(p ^ username[i % len(username)] for i, p in enumerate(plaintext))) % 13
+    0
+    """
+    max_key_length = min(max_key_length, len(ciphertext) // 2)
+    if max_key_length < 1:
+        return 1
+
+    rates = coincidence_rates(ciphertext, max_key_length)
+    best = max(rates)
+
+    return next(key_length for key_length, rate in enumerate(rates, 1) if rate >= tolerance * best)
+
+
+@functools.lru_cache(maxsize=None)
+def xor_weight_matrix():
+    """
+    weights[c, k] is the English log weight of ciphertext byte c decrypted
+    with key byte k, so column counts times it score every key byte at once.
+    Single precision is plenty for picking the best key byte and halves the
+    cost of the product. Built once, on first use (it needs NumPy).
+    """
+    numpy = load_numpy()
+    values = numpy.arange(256)
+    return numpy.array(ENGLISH_LOG_WEIGHTS, dtype=numpy.float32)[values[:, None] ^ values[None, :]]
+
+
+def key_byte_scores(ciphertext, key_length):
+    """
+    scores[i][k]: the total English log weight of column i decrypted with key
+    byte k. With NumPy every column is scored against all 256 candidates in
+    one product of the column counts with xor_weight_matrix().
+    """
+    counts = column_byte_counts(ciphertext, key_length)
+
+    numpy = load_numpy()
+    if numpy is None:
+        weights = ENGLISH_LOG_WEIGHTS
+        scores = []
+        for column_counts in counts:
+            present = [(c, count) for c, count in enumerate(column_counts) if count]
+            scores.append([sum(count * weights[c ^ k] for c, count in present) for k in range(256)])
+        return scores
+
+    return counts.astype(numpy.float32) @ xor_weight_matrix()
+
+
+def best_key(ciphertext, key_length):
+    """
+    The key of key_length bytes whose every byte makes its column read most
+    like English, and that key's mean log weight per byte of plaintext.
+
+    >>> key = b"ice"
+    >>> plaintext = b"Burning 'em, if you ain't quick and nimble I go crazy when I hear a cymbal"
+    >>> best_key(bytes(p ^ key[i % 3] for i, p in enumerate(plaintext)), 3)[0]
+    b'ice'
+    """
+    scores = key_byte_scores(ciphertext, key_length)
+
+    numpy = load_numpy()
+    if numpy is None:
+        key = bytes(max(range(256), key=column_scores.__getitem__) for column_scores in scores)
+        total = sum(max(column_scores) for column_scores in scores)
+    else:
+        key = scores.argmax(axis=1).astype(numpy.uint8).tobytes()
+        total = float(scores.max(axis=1).sum())
+
+    return key, total / max(len(ciphertext), 1)
+
+
+def shortest_key(ciphertext, key_length, margin=0.2):
+    """
+    The best key at the shortest divisor of key_length that reads within
+    margin (in mean log weight per byte) of the best key at key_length itself.
+    Short messages can make a multiple of the real key length look best, and
+    the longer key then overfits its few bytes per column.
+
+    >>> key = b"ice"
+    >>> plaintext = b"Burning 'em, if you ain't quick and nimble I go crazy when I hear a cymbal"
+    >>> shortest_key(bytes(p ^ key[i % 3] for i, p in enumerate(plaintext)), 6)
+    b'ice'
+    """
+    key, score = best_key(ciphertext, key_length)
+
+    for divisor in range(1, key_length):
+        if key_length % divisor == 0:
+            shorter_key, shorter_score = best_key(ciphertext, divisor)
+            if shorter_score >= score - margin:
+                return shorter_key
+
+    return key
+
+
+def xor_with_key(ciphertext, key):
+    """
+    ciphertext XORed with the repeating key, for a message already decoded
+    from base64
+
+    >>> xor_with_key(b"\\x00\\x01\\x02\\x03", b"ab")
+    b'acca'
+    """
+    out = bytearray(len(ciphertext))
+    return bytes(xor_into(out, ciphertext, repeating_key_tile(key, len(ciphertext)), 0))
+
+
+def batch_key_lengths(data, starts, lengths, max_key_length=40, tolerance=0.8):
+    """
+    estimate_key_length for each of the ciphertexts data[start:start + length]
+    packed into the NumPy byte array data, at once: for each shift, data is
+    compared with itself shifted across the whole batch, and the matches in
+    each message's compared positions are read off a running sum.
+    """
+    numpy = load_numpy()
+    starts = numpy.asarray(starts, dtype=numpy.int64)
+    lengths = numpy.asarray(lengths, dtype=numpy.int64)
+    max_shifts = numpy.minimum(max_key_length, lengths // 2)
+
+    # each message compares its first length - max_shifts positions, as coincidence_rates does
+    measured = max_shifts >= 1
+    compared = (lengths - max_shifts)[measured]
+    first_compared, last_compared = starts[measured], starts[measured] + compared
+    max_shift = int(max_shifts.max()) if len(max_shifts) else 0
+
+    rates = numpy.full((len(compared), max_shift), -1.0)
+    for shift in range(1, max_shift + 1):
+        running_matches = numpy.zeros(len(data) + 1, dtype=numpy.int32)
+        numpy.cumsum(data[:len(data) - shift] == data[shift:], out=running_matches[1:len(data) - shift + 1])
+        running_matches[len(data) - shift + 1:] = running_matches[len(data) - shift]
+
+        # shifts beyond a message's own max_shifts don't count
+        in_range = max_shifts[measured] >= shift
+        rates[in_range, shift - 1] = ((running_matches[last_compared] - running_matches[first_compared])
+                                      / compared)[in_range]
+
+    key_lengths = numpy.ones(len(lengths), dtype=numpy.int64)
+    if len(compared):
+        best = rates.max(axis=1)
+        key_lengths[measured] = (rates >= tolerance * best[:, None]).argmax(axis=1) + 1
+
+    return key_lengths
+
+
+def batch_best_keys(data, starts, lengths, candidates, chunk_size=1 << 16):
+    """
+    best_key for each (message index, key length) in candidates, a chunk of
+    about chunk_size ciphertext bytes at a time: the columns of every
+    candidate key in a chunk go into one bincount, get scored against all 256
+    key bytes by one product with xor_weight_matrix(), and the best byte of
+    every column is picked by one argmax. Chunking keeps the counts and
+    scores small enough to stay in cache however large the batch is.
+    """
+    numpy = load_numpy()
+    messages = numpy.array([message for message, _ in candidates], dtype=numpy.int64)
+    key_lengths = numpy.array([key_length for _, key_length in candidates], dtype=numpy.int64)
+    starts = numpy.asarray(starts, dtype=numpy.int64)[messages]
+    lengths = numpy.asarray(lengths, dtype=numpy.int64)[messages]
+    weights = xor_weight_matrix()
+
+    keys = []
+    first, entries_before = 0, numpy.cumsum(lengths) - lengths
+    while first < len(candidates):
+        last = max(int(numpy.searchsorted(entries_before, entries_before[first] + chunk_size)), first + 1)
+        chunk_key_lengths, chunk_lengths = key_lengths[first:last], lengths[first:last]
+        first_columns = numpy.concatenate([[0], numpy.cumsum(chunk_key_lengths)])
+
+        # one entry per byte of each candidate's message: the column of the candidate key it falls in
+        candidate_of_entry = numpy.repeat(numpy.arange(last - first), chunk_lengths)
+        chunk_entries_before = entries_before[first:last] - entries_before[first]
+        positions = numpy.arange(len(candidate_of_entry)) - chunk_entries_before[candidate_of_entry]
+        columns = first_columns[candidate_of_entry] + positions % chunk_key_lengths[candidate_of_entry]
+        bytes_read = data[starts[first:last][candidate_of_entry] + positions]
+
+        counts = numpy.bincount(columns * 256 + bytes_read, minlength=256 * int(first_columns[-1]))
+        scores = counts.reshape(-1, 256).astype(numpy.float32) @ weights
+        key_bytes = scores.argmax(axis=1).astype(numpy.uint8)
+        totals = numpy.add.reduceat(scores.max(axis=1).astype(numpy.float64), first_columns[:-1])
+
+        keys.extend((key_bytes[first_columns[index]:first_columns[index + 1]].tobytes(),
+                     float(totals[index]) / max(int(chunk_lengths[index]), 1))
+                    for index in range(last - first))
+        first = last
+
+    return keys
+
+
+def recover_key(encrypted, max_key_length=40):
+    """
+    Recovers an unknown repeating XOR key from a base64 message (decoded with
+    iter_base64_chunks) and returns (key, plaintext).
+
+    >>> plaintext = b"It was the best of times, it was the worst of times, it was the age of wisdom, " * 3
+    >>> recover_key(base64.b64encode(bytes(p ^ username[i % len(username)] for i, p in enumerate(plaintext))))[0]
+    b'mikemckay2203'
+    """
+    return recover_keys([encrypted], max_key_length)[0]
+
+
+def recover_keys(encrypted_messages, max_key_length=40, margin=0.2):
+    """
+    recover_key for each of a batch of base64 messages, returned as a list of
+    (key, plaintext) pairs. Each message is decoded from base64 once. With
+    NumPy the ciphertexts are packed into one array, and every step of the
+    recovery runs once for the whole batch: batch_key_lengths estimates the
+    key lengths, batch_best_keys scores each estimate and its divisors (the
+    candidates shortest_key would try), and one XOR against the gathered key
+    bytes decrypts all of the messages.
+
+    >>> plaintext = b"It was the best of times, it was the worst of times, it was the age of wisdom, " * 3
+    >>> messages = [base64.b64encode(bytes(p ^ key[i % len(key)] for i, p in enumerate(plaintext)))
+    ...             for key in (username, b"ice", b"Vanilla")]
+    >>> [key for key, _ in recover_keys(messages)]
+    [b'mikemckay2203', b'ice', b'Vanilla']
+    >>> all(recovered == plaintext for _, recovered in recover_keys(messages))
+    True
+    """
+    ciphertexts = [b"".join(iter_base64_chunks(io.BytesIO(encrypted))) for encrypted in encrypted_messages]
+
+    numpy = load_numpy()
+    if numpy is None or not ciphertexts:
+        keys = [shortest_key(ciphertext, estimate_key_length(ciphertext, max_key_length), margin)
+                for ciphertext in ciphertexts]
+        return [(key, xor_with_key(ciphertext, key)) for key, ciphertext in zip(keys, ciphertexts)]
+
+    lengths = numpy.array([len(ciphertext) for ciphertext in ciphertexts], dtype=numpy.int64)
+    starts = numpy.concatenate([[0], numpy.cumsum(lengths)[:-1]]).astype(numpy.int64)
+    data = numpy.frombuffer(b"".join(ciphertexts), numpy.uint8)
+
+    # for each message, its estimated key length followed by that length's other divisors in increasing order
+    candidates = []
+    for message, key_length in enumerate(batch_key_lengths(data, starts, lengths, max_key_length).tolist()):
+        candidates.append((message, key_length))
+        candidates += [(message, divisor) for divisor in range(1, key_length) if key_length % divisor == 0]
+
+    keys = []
+    for (message, _), (key, score) in zip(candidates, batch_best_keys(data, starts, lengths, candidates)):
+        if len(keys) == message:
+            # the key at the estimated length, which a shorter key has to read almost as well as
+            keys.append(key)
+            estimated_score, shortened = score, False
+        elif not shortened and score >= estimated_score - margin:
+            keys[message] = key
+            shortened = True
+
+    # the key byte under every byte of data, gathered from the keys laid end to end
+    key_lengths = numpy.array([len(key) for key in keys], dtype=numpy.int64)
+    first_key_bytes = numpy.concatenate([[0], numpy.cumsum(key_lengths)[:-1]])
+    message_of_byte = numpy.repeat(numpy.arange(len(keys)), lengths)
+    positions = numpy.arange(len(data)) - starts[message_of_byte]
+    key_stream = numpy.frombuffer(b"".join(keys), numpy.uint8)[
+        first_key_bytes[message_of_byte] + positions % key_lengths[message_of_byte]]
+    plaintexts = (data ^ key_stream).tobytes()
+
+    return [(key, plaintexts[start:start + length])
+            for key, start, length in zip(keys, starts.tolist(), lengths.tolist())]
+
 
-message_int = int.from_bytes(bde, byteorder='little')
+if __name__ == '__main__':
+    if len(sys.argv) > 1 and sys.argv[1] == '--recover':
+        # python message.py --recover [file]: one base64 message per line in, "<key hex> <plaintext repr>" per line out
+        source = open(sys.argv[2], 'rb') if len(sys.argv) > 2 else sys.stdin.buffer
+        messages = [line.strip() for line in source if line.strip()]
 
-xored = message_int ^ username_repeated
+        for key, plaintext in recover_keys(messages):
+            print(key.hex(), repr(plaintext))
+    elif len(sys.argv) > 1:
+        # python message.py <file or -> [key]: stream the decoded plaintext to stdout
+        key = sys.argv[2].encode() if len(sys.argv) > 2 else username
 
-n = xored
-print(n.to_bytes((n.bit_length() + 7) // 8, 'little').decode())
+        if sys.argv[1] == '-':
+            decode_stream(sys.stdin.buffer, sys.stdout.buffer, key)
+        else:
+            with open(sys.argv[1], 'rb') as source:
+                decode_stream(source, sys.stdout.buffer, key)
+    else:
+        # FRIKE appears twice... what does this mean
+        print(base64.b64decode(encrypted))
+        print(decode(encrypted, username).decode())
@@ -0,0 +1,261 @@
+"""
+An on-disk cache of solver results shared by every process that opens the
+same file. Each solver input is first put in a canonical form, so inputs
+that must have the same answer share an entry: a banana list in any order,
+a doomsday matrix with its rows scaled, a nebula grid in any of its 8
+reflections and rotations. The canonical form is then hashed to get the key.
+
+The store is SQLite in WAL mode with the database memory-mapped, so hits
+are served from the page cache. SQLite's file locking makes it safe for
+concurrent readers and writers in different processes. The total size of
+the stored results is kept under max_bytes by evicting the least recently
+used entries.
+
+>>> import os, tempfile
+>>> cache = ResultCache(os.path.join(tempfile.mkdtemp(), 'results.sqlite'))
+>>> cache.solve('distract_the_trainers', [1, 7, 3, 21, 13, 19], engine='dense')
+0
+>>> cache.solve('distract_the_trainers', [19, 13, 21, 3, 7, 1], engine='dense'), cache.hits, cache.misses
+(0, 1, 1)
+"""
+import hashlib
+import json
+import math
+import os
+import sqlite3
+import time
+from functools import reduce
+
+import solvers
+
+
+def canonical_bomb_baby_input(x, y):
+    """
+    >>> canonical_bomb_baby_input('007', '4')
+    ['7', '4']
+    """
+    return [str(int(x)), str(int(y))]
+
+
+def canonical_fuel_injection_input(n):
+    return str(int(n))
+
+
+def canonical_running_with_bunnies_input(times, time_limit, engine=None):
+    return [times, time_limit]
+
+
+def canonical_doomsday_fuel_input(m, engine=None):
+    """
+    Only the ratios within a row of m matter, so each row is divided by the
+    gcd of its entries. Both engines give the same exact answer.
+
+    >>> canonical_doomsday_fuel_input([[0, 2, 4], [0, 0, 0], [0, 0, 0]])
+    [[0, 1, 2], [0, 0, 0], [0, 0, 0]]
+    """
+    canonical_m = []
+    for row in m:
+        row_gcd = reduce(math.gcd, row, 0) or 1
+        canonical_m.append([entry // row_gcd for entry in row])
+    return canonical_m
+
+
+def canonical_nebula_input(g, engine=None):
+    """
+    the canonical_grid_key of g, with the cells packed into a hex string
+    (every engine gives the same count)
+
+    >>> canonical_nebula_input([[True, False], [False, False]]) == canonical_nebula_input([[False, False], [False, True]])
+    True
+    """
+    import expanding_nebula
+
+    height, width, cells = expanding_nebula.canonical_grid_key(g)
+    return [height, width, format(cells, 'x')]
+
+
+def canonical_distract_the_trainers_input(banana_list, engine=None):
+    """
+    The number of unmatched trainers doesn't depend on their order, or on the
+    engine for the engines that find a maximum matching. The 'reference'
+    engine can miss one (it leaves a trainer unmatched in [48, 42, 5, 90, 6,
+    90]), so its results are not cached.
+
+    >>> canonical_distract_the_trainers_input([7, 1, 3], engine='dense')
+    [1, 3, 7]
+    >>> canonical_distract_the_trainers_input([7, 1, 3], engine='reference') is None
+    True
+    """
+    if engine == 'reference':
+        return None
+    return sorted(banana_list)
+
+
+# solver name: (namespace shared by solvers that give the same answers, input canonicalizer)
+CANONICAL_INPUTS = {
+    'bomb_baby': ('bomb_baby', canonical_bomb_baby_input),
+    'fuel_injection_perfection': ('fuel_injection_perfection', canonical_fuel_injection_input),
+    'running_with_bunnies': ('running_with_bunnies', canonical_running_with_bunnies_input),
+    'doomsday_fuel': ('doomsday_fuel', canonical_doomsday_fuel_input),
+    'expanding_nebula': ('expanding_nebula', canonical_nebula_input),
+    'expanding_nebula_in_place': ('expanding_nebula', canonical_nebula_input),
+    'expanding_nebula_planned': ('expanding_nebula', canonical_nebula_input),
+    'distract_the_trainers': ('distract_the_trainers', canonical_distract_the_trainers_input),
+}
+
+
+def cache_key(name, args, kwargs):
+    """
+    The SHA-256 digest of the canonical input of a call to the solver name,
+    or None if the solver's results aren't cached (trainer_pairing depends
+    on the order of its input, for example) or its canonicalizer returns None
+    for this call.
+
+    >>> cache_key('bomb_baby', ['4', '7'], {}) == cache_key('bomb_baby', ['04', '7'], {})
+    True
+    >>> cache_key('trainer_pairing', [[1, 1]], {}) is None
+    True
+    """
+    if name not in CANONICAL_INPUTS:
+        return None
+
+    namespace, canonicalize = CANONICAL_INPUTS[name]
+    canonical_input = canonicalize(*args, **kwargs)
+    if canonical_input is None:
+        return None
+
+    canonical_input = json.dumps([namespace, canonical_input], sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(canonical_input.encode()).digest()
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    key BLOB PRIMARY KEY,
+    value TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    last_used REAL NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS results_by_last_used ON results (last_used);
+CREATE TABLE IF NOT EXISTS total_size (id INTEGER PRIMARY KEY CHECK (id = 0), bytes INTEGER NOT NULL);
+INSERT OR IGNORE INTO total_size VALUES (0, 0);
+CREATE TRIGGER IF NOT EXISTS results_inserted AFTER INSERT ON results
+    BEGIN UPDATE total_size SET bytes = bytes + new.size; END;
+CREATE TRIGGER IF NOT EXISTS results_deleted AFTER DELETE ON results
+    BEGIN UPDATE total_size SET bytes = bytes - old.size; END;
+CREATE TRIGGER IF NOT EXISTS results_resized AFTER UPDATE OF size ON results
+    BEGIN UPDATE total_size SET bytes = bytes + new.size - old.size; END;
+"""
+
+
+class ResultCache(object):
+    """
+    A size-bounded LRU store of JSON results in the SQLite file at path.
+    Every process (including ones forked after the cache was created) opens
+    its own connection on first use.
+    """
+
+    def __init__(self, path, max_bytes=256 << 20, mmap_bytes=256 << 20, eviction_batch=64):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.mmap_bytes = mmap_bytes
+        self.eviction_batch = eviction_batch
+        self.hits = 0
+        self.misses = 0
+        self.open_connection = None
+        self.connection_pid = None
+
+    def connection(self):
+        if self.open_connection is None or self.connection_pid != os.getpid():
+            # autocommit mode, so transactions are only the ones started explicitly
+            connection = sqlite3.connect(self.path, timeout=60, isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            connection.execute('PRAGMA mmap_size={:d}'.format(self.mmap_bytes))
+            connection.executescript(SCHEMA)
+
+            self.open_connection = connection
+            self.connection_pid = os.getpid()
+
+        return self.open_connection
+
+    def get(self, key):
+        """
+        the stored result for key (marking it as recently used), or None
+        """
+        connection = self.connection()
+        row = connection.execute('SELECT value FROM results WHERE key = ?', (key,)).fetchone()
+        if row is None:
+            return None
+
+        connection.execute('UPDATE results SET last_used = ? WHERE key = ?', (time.time(), key))
+        return json.loads(row[0])
+
+    def put(self, key, value):
+        """
+        stores the JSON-encodable value under key, then evicts the least
+        recently used results until the total size is back under max_bytes
+        """
+        encoded_value = json.dumps(value, separators=(',', ':'))
+        connection = self.connection()
+
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            connection.execute(
+                'INSERT INTO results VALUES (?, ?, ?, ?) ON CONFLICT (key) DO UPDATE SET'
+                ' value = excluded.value, size = excluded.size, last_used = excluded.last_used',
+                (key, encoded_value, len(key) + len(encoded_value), time.time()))
+
+            while connection.execute('SELECT bytes FROM total_size').fetchone()[0] > self.max_bytes:
+                connection.execute(
+                    'DELETE FROM results WHERE key IN (SELECT key FROM results ORDER BY last_used LIMIT ?)',
+                    (self.eviction_batch,))
+
+            connection.execute('COMMIT')
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+
+    def total_bytes(self):
+        return self.connection().execute('SELECT bytes FROM total_size').fetchone()[0]
+
+    def __len__(self):
+        return self.connection().execute('SELECT COUNT(*) FROM results').fetchone()[0]
+
+    def solve(self, name, *args, **kwargs):
+        """
+        solvers.solve(name, ...) answered from the cache when possible. The
+        result is returned in its JSON form (see solvers.json_result) whether
+        or not it came from the cache.
+
+        >>> import os, tempfile
+        >>> cache = ResultCache(os.path.join(tempfile.mkdtemp(), 'results.sqlite'))
+        >>> cache.solve('distract_the_trainers', [48, 42, 5, 90, 6, 90], engine='reference')
+        1
+        >>> cache.solve('distract_the_trainers', [48, 42, 5, 90, 6, 90], engine='dense'), cache.hits
+        (0, 0)
+        """
+        key = cache_key(name, args, kwargs)
+        if key is not None:
+            cached_result = self.get(key)
+            if cached_result is not None:
+                self.hits += 1
+                return cached_result
+
+        result = solvers.json_result(solvers.solve(name, *args, **kwargs))
+        if key is not None:
+            self.misses += 1
+            self.put(key, result)
+
+        return result
+
+
+open_caches = dict()
+
+
+def open_cache(path, **kwargs):
+    """
+    the ResultCache for path, shared by all callers in this process
+    """
+    if path not in open_caches:
+        open_caches[path] = ResultCache(path, **kwargs)
+    return open_caches[path]
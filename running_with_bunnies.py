@@ -1,11 +1,41 @@
+import array
+import collections
+import functools
 import itertools
 
+import autotune
+import instrumentation
 
-def all_pairs_shortest_paths(weights):
+
+@functools.lru_cache(maxsize=None)
+def load_numpy():
+    """
+    NumPy, or None if it is not installed. It is only needed by the batch
+    solver, so it is imported when that first runs.
+    """
+    try:
+        import numpy
+    except ImportError:
+        return None
+    return numpy
+
+
+ROUTE_ENGINES = ('permutations', 'held_karp')
+
+# route costs held in memory at once by batch_solution
+BATCH_ROUTE_COSTS = 1 << 22
+
+
+def all_pairs_shortest_paths(weights, with_next_hops=False):
     """
     Use the Floyd-Warshall algorithm to construct a matrix of all-pairs shortest
     path costs, given the edge-weight matrix of a complete weighted graph.
 
+    With with_next_hops=True the same pass also builds the next-hop matrix,
+    flattened into an array('i'): next_hops[i * n + j] is the vertex after
+    i on a shortest path from i to j. The costs and the next hops are then
+    returned together.
+
     >>> weights = [\
         [0, 4, 100, 100, 100, 100, 10, 4],\
         [100, 0, 9, 100, 100, 7, 8, 1],\
@@ -28,21 +58,158 @@ def all_pairs_shortest_paths(weights):
         [100, 100, 5, 20, 15, 20, 100, 0],\
         ]
     True
+
+    >>> costs, next_hops = all_pairs_shortest_paths([[0, 5, 1], [5, 0, 1], [1, 1, 0]], with_next_hops=True)
+    >>> costs, next_hops.tolist()
+    ([[0, 2, 1], [2, 0, 1], [1, 1, 0]], [0, 2, 2, 2, 1, 2, 0, 1, 2])
     """
-    vertices = range(len(weights))
+    n = len(weights)
+    vertices = range(n)
+    next_hops = array.array('i', [j for _ in vertices for j in vertices]) if with_next_hops else None
 
     for (k, i, j) in itertools.product(vertices, repeat=3):
         if weights[i][j] > weights[i][k] + weights[k][j]:
             weights[i][j] = weights[i][k] + weights[k][j]
+            if next_hops is not None:
+                next_hops[i * n + j] = next_hops[i * n + k]
+
+    return (weights, next_hops) if with_next_hops else weights
+
 
-    return weights
+def expand_route(next_hops, locations, stops):
+    """
+    Yields every location on the route through stops, in order, following
+    the shortest path (in the flattened next-hop matrix of a hallway with
+    the given number of locations) between each pair of consecutive stops.
+
+    >>> list(expand_route([0, 2, 2, 2, 1, 2, 0, 1, 2], 3, [0, 1, 2]))
+    [0, 2, 1, 2]
+    """
+    yield stops[0]
+    for from_location, to_location in zip(stops, stops[1:]):
+        location = from_location
+        while location != to_location:
+            location = next_hops[location * locations + to_location]
+            yield location
 
 
 def shortest_paths_costs_contain_negative_cycle(costs_matrix):
     return any(costs_matrix[vertex][vertex] < 0 for vertex in range(len(costs_matrix)))
 
 
-def solution(times, time_limit):
+def fastest_route_times(shortest_paths_times, stops):
+    """
+    The Held-Karp table for visiting stops (a list of locations) starting
+    from location 0: route_times[stop_set][last] is the least time of a
+    route from the start through exactly the stops in stop_set (a bitmask,
+    bit i for stops[i]) that ends at stops[last], or infinity if stops[last]
+    isn't in stop_set.
+    """
+    infinity = float('inf')
+
+    route_times = [[infinity] * len(stops) for _ in range(1 << len(stops))]
+    for index, stop in enumerate(stops):
+        route_times[1 << index][index] = shortest_paths_times[0][stop]
+
+    for stop_set in range(1, 1 << len(stops)):
+        for last, route_time in enumerate(route_times[stop_set]):
+            if route_time == infinity:
+                continue
+
+            times_from_last = shortest_paths_times[stops[last]]
+            for index, stop in enumerate(stops):
+                if not stop_set >> index & 1:
+                    extended_time = route_time + times_from_last[stop]
+                    extended_times = route_times[stop_set | 1 << index]
+                    if extended_time < extended_times[index]:
+                        extended_times[index] = extended_time
+
+    return route_times
+
+
+def fastest_rescue_times(shortest_paths_times):
+    """
+    Uses the Held-Karp dynamic program to find, for every set of bunnies, the
+    least time taken by a route from the start through exactly those bunnies
+    to the bulkhead. The sets are bitmasks (bit i for bunny i), so the result
+    is a list of 2 ** bunnies times indexed by set.
+
+    >>> fastest_rescue_times([[0, 1, 2], [1, 0, 1], [2, 1, 0]])
+    [2, 2]
+    >>> fastest_rescue_times([[0, 1, 3, 2], [1, 0, 2, 1], [3, 2, 0, 3], [2, 1, 3, 0]])
+    [2, 2, 6, 6]
+    """
+    bulkhead = len(shortest_paths_times) - 1
+    bunny_locations = list(range(1, bulkhead))
+    route_times = fastest_route_times(shortest_paths_times, bunny_locations)
+
+    rescue_times = [shortest_paths_times[0][bulkhead]]
+    for bunny_set in range(1, 1 << len(bunny_locations)):
+        rescue_times.append(min(route_time + shortest_paths_times[location][bulkhead]
+                                for location, route_time in zip(bunny_locations, route_times[bunny_set])))
+
+    return rescue_times
+
+
+def fastest_visiting_order(shortest_paths_times, bunny_ids):
+    """
+    The order to visit bunny_ids in that takes the least time from the start
+    to the bulkhead, traced back through the fastest_route_times table.
+
+    >>> fastest_visiting_order([[0, 1, 3, 2], [1, 0, 2, 1], [3, 2, 0, 3], [2, 1, 3, 0]], [0, 1])
+    [1, 0]
+    """
+    if not bunny_ids:
+        return []
+
+    bulkhead = len(shortest_paths_times) - 1
+    stops = [bunny + 1 for bunny in bunny_ids]
+    route_times = fastest_route_times(shortest_paths_times, stops)
+
+    stop_set = (1 << len(stops)) - 1
+    last = min(range(len(stops)), key=lambda index: route_times[stop_set][index]
+               + shortest_paths_times[stops[index]][bulkhead])
+
+    reversed_order = [last]
+    while stop_set != 1 << last:
+        previous_set = stop_set ^ 1 << last
+        last_time = route_times[stop_set][last]
+        previous = next(index for index in range(len(stops)) if previous_set >> index & 1
+                        and route_times[previous_set][index] + shortest_paths_times[stops[index]][stops[last]] == last_time)
+
+        reversed_order.append(previous)
+        stop_set, last = previous_set, previous
+
+    return [bunny_ids[index] for index in reversed(reversed_order)]
+
+
+def held_karp_rescue(shortest_paths_times, time_limit):
+    """
+    The largest set of bunnies that can be rescued within the time limit
+    (the one with the lowest ids among the largest), found with
+    fastest_rescue_times in O(2 ** n * n ** 2) time rather than by trying
+    all of the n! routes.
+
+    >>> held_karp_rescue([[0, 1, 3, 2], [1, 0, 2, 1], [3, 2, 0, 3], [2, 1, 3, 0]], 5)
+    [0]
+    """
+    bunnies = len(shortest_paths_times) - 2
+    rescued_bunnies = None
+
+    for bunny_set, rescue_time in enumerate(fastest_rescue_times(shortest_paths_times)):
+        if rescue_time <= time_limit:
+            bunny_ids = [bunny for bunny in range(bunnies) if bunny_set >> bunny & 1]
+            if rescued_bunnies is None or (-len(bunny_ids), bunny_ids) < (-len(rescued_bunnies), rescued_bunnies):
+                rescued_bunnies = bunny_ids
+
+    stats = instrumentation.active()
+    if stats is not None:
+        stats.count('running_with_bunnies.route_sets', 1 << bunnies)
+
+    return rescued_bunnies or []
+
+
+def solution(times, time_limit, engine=None):
     """
     This problem is a variation of the Travelling Salesman Problem (TSP) in
     which cities may be revisited, except the tour begins and ends at specific vertices.
@@ -63,6 +230,10 @@ def solution(times, time_limit):
     approximation algorithm, e.g. Christofides' algorithm, to place a lower bound on
     possible route times.
 
+    The route search engine can be selected: 'permutations' (the brute-force
+    search) or 'held_karp' (held_karp_rescue, a dynamic program over sets of
+    bunnies). By default autotune picks the faster one for the number of bunnies.
+
     >>> times_1 = [\
     [0, 2, 1, 1, -1],\
     [8, 0, 1, 1, -1],\
@@ -70,7 +241,7 @@ def solution(times, time_limit):
     [8, 2, 1, 0, -1],\
     [9, 3, 2, 2, 0]]
 
-    >>> solution(times_1, 1)
+    >>> solution(times_1, 1, engine='permutations')
     [1, 2]
 
     >>> times_2 = [\
@@ -81,9 +252,9 @@ def solution(times, time_limit):
     [9, 1, 2, 2, 0]]
 
     Can do 0 -> 4 -> 2 -> 3 -> 1 -> 4 (weight 1 + 2 + 8 + 8 + 1 = 20).
-    >>> solution(times_2, 20)
+    >>> solution(times_2, 20, engine='permutations')
     [0, 1, 2]
-    >>> solution(times_2, 19)
+    >>> solution(times_2, 19, engine='permutations')
     [0, 1]
 
     >>> times_3 = [\
@@ -95,7 +266,7 @@ def solution(times, time_limit):
      [525, 0, 740, 810, 53, 0, 708],\
      [841, 300, 604, 604, 624, 628, 0]]
 
-    >>> solution(times_3, 999)
+    >>> solution(times_3, 999, engine='permutations')
     [0, 1, 4]
 
     >>> times_4 = [\
@@ -106,32 +277,267 @@ def solution(times, time_limit):
     [9, 1, 2, 2, 0]]
 
 
-    >>> solution(times_4, 1)
+    >>> solution(times_4, 1, engine='permutations')
     []
+
+    >>> solution(times_3, 999, engine='held_karp')
+    [0, 1, 4]
     """
-    bunny_locations = list(range(1, len(times) - 1))
-    shortest_paths_times = all_pairs_shortest_paths(times)
+    engine = route_search_engine(times, engine)
+
+    with instrumentation.timed('running_with_bunnies.shortest_paths'):
+        shortest_paths_times = all_pairs_shortest_paths(times)
+
+    return rescued_bunnies(shortest_paths_times, time_limit, engine)
+
+
+def route_search_engine(times, engine):
+    if engine is None:
+        engine = autotune.choose_engine('running_with_bunnies', times)
+    if engine not in ROUTE_ENGINES:
+        raise ValueError("unknown route search engine " + repr(engine))
+
+    return engine
+
 
+def rescued_bunnies(shortest_paths_times, time_limit, engine):
+    """
+    the answer of solution, given the shortest paths times of the hallway
+    """
     if shortest_paths_costs_contain_negative_cycle(shortest_paths_times):
         # go backwards in time arbitrarily far and save all bunnies
-        return list(range(0, len(times) - 2))
+        return list(range(0, len(shortest_paths_times) - 2))
 
+    if engine == 'held_karp':
+        return held_karp_rescue(shortest_paths_times, time_limit)
+
+    bunny_locations = list(range(1, len(shortest_paths_times) - 1))
+    stats = instrumentation.active()
+    permutations_tried = 0
     for bunny_route_length in range(len(bunny_locations), 0, -1):
-        for bunny_route_in_reduced_graph in itertools.permutations(bunny_locations, bunny_route_length):
-            full_route_in_reduced_graph = [0] + \
-                list(bunny_route_in_reduced_graph) + [len(times) - 1]
-
-            # calculate the full route time, including possible revisits, in the original graph
-            full_route_time = 0
-            for path_step in range(1, bunny_route_length + 2):
-                from_location = full_route_in_reduced_graph[path_step - 1]
-                to_location = full_route_in_reduced_graph[path_step]
-                full_route_time += shortest_paths_times[from_location][to_location]
-
-            if full_route_time <= time_limit:
-                # This path is acceptable and uses the lowest bunny indices for this path
-                # length (since we consider bunny paths in permutation order). Since we
-                # started with the longest paths this is the best path possible.
-                return sorted([location - 1 for location in bunny_route_in_reduced_graph])
+        for bunny_set in itertools.combinations(bunny_locations, bunny_route_length):
+            for bunny_route_in_reduced_graph in itertools.permutations(bunny_set):
+                if stats is not None:
+                    permutations_tried += 1
+                full_route_in_reduced_graph = [0] + \
+                    list(bunny_route_in_reduced_graph) + [len(shortest_paths_times) - 1]
+
+                # calculate the full route time, including possible revisits, in the original graph
+                full_route_time = 0
+                for path_step in range(1, bunny_route_length + 2):
+                    from_location = full_route_in_reduced_graph[path_step - 1]
+                    to_location = full_route_in_reduced_graph[path_step]
+                    full_route_time += shortest_paths_times[from_location][to_location]
 
+                if full_route_time <= time_limit:
+                    # This path is acceptable and uses the lowest bunny indices for this path
+                    # length (since we consider the sets of bunnies in lexicographic order, and
+                    # every route through a set before moving on to the next). Since we
+                    # started with the longest paths this is the best path possible.
+                    if stats is not None:
+                        stats.count('running_with_bunnies.permutations', permutations_tried)
+                    return [location - 1 for location in bunny_set]
+
+    if stats is not None:
+        stats.count('running_with_bunnies.permutations', permutations_tried)
     return []
+
+
+class RescuePlan(object):
+    """
+    The bunnies rescued by solution, the order to visit them in and the
+    time that takes. route() expands the route corridor by corridor from the
+    next hops kept while the shortest paths were computed. When the hallway
+    has a negative cycle every bunny is rescued by going round it often
+    enough, so there is no single best route: visiting_order and time are
+    None and route() raises ValueError.
+    """
+
+    def __init__(self, bunnies, visiting_order, time, next_hops, locations):
+        self.bunnies = bunnies
+        self.visiting_order = visiting_order
+        self.time = time
+        self.next_hops = next_hops
+        self.locations = locations
+
+    def stops(self):
+        """
+        the locations the route stops at: the start, the bunnies in visiting
+        order, then the bulkhead
+        """
+        if self.visiting_order is None:
+            raise ValueError('a negative cycle makes routes arbitrarily fast, so there is no best route')
+
+        return [0] + [bunny + 1 for bunny in self.visiting_order] + [self.locations - 1]
+
+    def route(self):
+        """
+        an iterator over every location the route passes through, in order
+        """
+        return expand_route(self.next_hops, self.locations, self.stops())
+
+    def as_dict(self):
+        return {'bunnies': self.bunnies, 'visiting_order': self.visiting_order, 'time': self.time,
+                'route': None if self.visiting_order is None else list(self.route())}
+
+
+def rescue_plan(times, time_limit, engine=None):
+    """
+    solution(times, time_limit, engine) as a RescuePlan. The shortest paths
+    are computed once, together with their next hops, and the fastest order
+    to visit the rescued bunnies in is found with fastest_visiting_order.
+
+    >>> times_2 = [[0, 8, 8, 8, 1], [8, 0, 8, 8, 1], [8, 8, 0, 8, 8], [8, 8, 8, 0, 8], [9, 1, 2, 2, 0]]
+    >>> plan = rescue_plan(times_2, 20, engine='held_karp')
+    >>> plan.bunnies, plan.visiting_order, plan.time
+    ([0, 1, 2], [2, 1, 0], 20)
+    >>> list(plan.route())
+    [0, 4, 3, 2, 1, 4]
+    """
+    engine = route_search_engine(times, engine)
+
+    with instrumentation.timed('running_with_bunnies.shortest_paths'):
+        shortest_paths_times, next_hops = all_pairs_shortest_paths(times, with_next_hops=True)
+
+    bunnies = rescued_bunnies(shortest_paths_times, time_limit, engine)
+    if shortest_paths_costs_contain_negative_cycle(shortest_paths_times):
+        return RescuePlan(bunnies, None, None, next_hops, len(times))
+
+    plan = RescuePlan(bunnies, fastest_visiting_order(shortest_paths_times, bunnies), None, next_hops, len(times))
+    stops = plan.stops()
+    plan.time = sum(shortest_paths_times[from_location][to_location]
+                    for from_location, to_location in zip(stops, stops[1:]))
+
+    return plan
+
+
+def rescue_route(times, time_limit, engine=None):
+    """
+    rescue_plan(times, time_limit, engine) with its route expanded, as a
+    dict (for the solvers registry)
+    """
+    return rescue_plan(times, time_limit, engine).as_dict()
+
+
+# number of bunnies: (step indices, bunny set of each route), built on first use
+route_tables = dict()
+
+
+def route_table(bunnies):
+    """
+    Every route the permutation search tries for this many bunnies, in the
+    order it tries them. steps[i][r] is the index of the i-th step of route
+    r in the flattened (bunnies + 2) x (bunnies + 2) times matrix, where
+    routes shorter than bunnies + 1 steps are padded with the index just past
+    the matrix (which batch_solution fills with a zero time). bunny_sets[r]
+    is the bunny ids of route r. With NumPy steps is an array.
+
+    >>> steps, bunny_sets = route_table(2)
+    >>> [[int(index) for index in step] for step in steps]
+    [[1, 2, 1, 2], [6, 9, 7, 11], [11, 7, 16, 16]]
+    >>> bunny_sets
+    [[0, 1], [0, 1], [0], [1]]
+    """
+    if bunnies not in route_tables:
+        locations = bunnies + 2
+        padding = locations * locations
+        steps = [[] for _ in range(bunnies + 1)]
+        bunny_sets = []
+
+        for bunny_route_length in range(bunnies, 0, -1):
+            for bunny_set in itertools.combinations(range(1, bunnies + 1), bunny_route_length):
+                bunny_ids = [location - 1 for location in bunny_set]
+                for bunny_route in itertools.permutations(bunny_set):
+                    full_route = (0,) + bunny_route + (locations - 1,)
+                    for step in range(bunnies + 1):
+                        if step + 1 < len(full_route):
+                            steps[step].append(full_route[step] * locations + full_route[step + 1])
+                        else:
+                            steps[step].append(padding)
+                    bunny_sets.append(bunny_ids)
+
+        numpy = load_numpy()
+        if numpy is not None:
+            steps = numpy.array(steps, dtype=numpy.intp).reshape(bunnies + 1, len(bunny_sets))
+        route_tables[bunnies] = (steps, bunny_sets)
+
+    return route_tables[bunnies]
+
+
+def batched_shortest_paths(times):
+    """
+    all_pairs_shortest_paths on a (batch, locations, locations) array of
+    times matrices at once, in place
+    """
+    numpy = load_numpy()
+    for via in range(times.shape[1]):
+        numpy.minimum(times, times[:, :, via, None] + times[:, None, via, :], out=times)
+    return times
+
+
+def batch_solution(instances):
+    """
+    solution(times, time_limit) for each (times, time_limit) in instances,
+    without modifying the times. With NumPy, the instances with the same
+    number of bunnies are solved together: Floyd-Warshall runs on all of
+    their times matrices at once, the time of every route in route_table is
+    summed for all of them with one gather per step, and each instance's
+    answer is the bunny set of its first route within the time limit. This
+    is the same route the permutation search stops at, without the
+    interpreter overhead of a loop per instance and per route.
+
+    >>> times_2 = [[0, 8, 8, 8, 1], [8, 0, 8, 8, 1], [8, 8, 0, 8, 8], [8, 8, 8, 0, 8], [9, 1, 2, 2, 0]]
+    >>> times_1 = [[0, 2, 2, 2, -1], [9, 0, 2, 2, -1], [9, 3, 0, 2, -1], [9, 3, 2, 0, -1], [9, 3, 2, 2, 0]]
+    >>> batch_solution([(times_2, 20), (times_2, 19), (times_2, 1), (times_1, 1), ([[0, 1], [1, 0]], 3)])
+    [[0, 1, 2], [0, 1], [], [1, 2], []]
+    """
+    instances = list(instances)
+    numpy = load_numpy()
+    if numpy is None:
+        return [solution([list(row) for row in times], time_limit) for times, time_limit in instances]
+
+    instances_by_size = collections.defaultdict(list)
+    for index, (times, _) in enumerate(instances):
+        instances_by_size[len(times)].append(index)
+
+    results = [None] * len(instances)
+    stats = instrumentation.active()
+
+    for locations, indices in instances_by_size.items():
+        bunnies = locations - 2
+        steps, bunny_sets = route_table(bunnies)
+        batch_size = max(1, BATCH_ROUTE_COSTS // max(1, len(bunny_sets)))
+
+        for batch_start in range(0, len(indices), batch_size):
+            batch = indices[batch_start:batch_start + batch_size]
+            times = batched_shortest_paths(numpy.array([instances[index][0] for index in batch], dtype=numpy.int64))
+            time_limits = numpy.array([instances[index][1] for index in batch], dtype=numpy.int64)
+            negative_cycles = (numpy.diagonal(times, axis1=1, axis2=2) < 0).any(axis=1)
+
+            if bunny_sets:
+                # the flattened times with a zero appended for the padding steps
+                flat_times = numpy.zeros((len(batch), locations * locations + 1), dtype=numpy.int64)
+                flat_times[:, :-1] = times.reshape(len(batch), -1)
+
+                route_times = flat_times[:, steps[0]]
+                for step in steps[1:]:
+                    route_times += flat_times[:, step]
+
+                feasible = route_times <= time_limits[:, None]
+                first_feasible = feasible.argmax(axis=1)
+                any_feasible = feasible[numpy.arange(len(batch)), first_feasible]
+            else:
+                any_feasible = numpy.zeros(len(batch), dtype=bool)
+
+            for position, index in enumerate(batch):
+                if negative_cycles[position]:
+                    results[index] = list(range(bunnies))
+                elif any_feasible[position]:
+                    results[index] = list(bunny_sets[first_feasible[position]])
+                else:
+                    results[index] = []
+
+            if stats is not None:
+                stats.count('running_with_bunnies.batched_routes', len(batch) * len(bunny_sets))
+
+    return results
@@ -0,0 +1,136 @@
+"""
+A registry of the solvers, each imported on first use, and a command line
+interface that dispatches to any of them:
+
+    python solvers.py --list
+    python solvers.py bomb_baby '"4"' '"7"'
+    python solvers.py distract_the_trainers '[1, 7, 3, 21, 13, 19]' --option engine='"dense"'
+    echo '[[[0, 2, 1, 0, 0], [0, 0, 0, 3, 4], [0, 0, 0, 0, 0], [0, 0, 0, 0, 0], [0, 0, 0, 0, 0]]]' | python solvers.py doomsday_fuel -
+
+Arguments (and option values) are JSON; the result is printed as JSON.
+Importing this module imports none of the solver modules.
+"""
+import importlib
+import json
+import sys
+
+# solver name: (module, function)
+SOLVERS = {
+    'bomb_baby': ('bomb_baby', 'solution'),
+    'fuel_injection_perfection': ('fuel_injection_perfection', 'solution'),
+    'running_with_bunnies': ('running_with_bunnies', 'solution'),
+    'running_with_bunnies_batch': ('running_with_bunnies', 'batch_solution'),
+    'running_with_bunnies_route': ('running_with_bunnies', 'rescue_route'),
+    'doomsday_fuel': ('doomsday_fuel', 'solution'),
+    'doomsday_fuel_approximate': ('doomsday_fuel', 'approximate_solution'),
+    'expanding_nebula': ('expanding_nebula', 'solution'),
+    'expanding_nebula_in_place': ('expanding_nebula', 'solution_in_place'),
+    'expanding_nebula_planned': ('expanding_nebula', 'planned_solution'),
+    'distract_the_trainers': ('distract_the_trainers', 'solution'),
+    'trainer_pairing': ('distract_the_trainers', 'trainer_pairing'),
+}
+
+loaded_solvers = dict()
+
+
+def get_solver(name):
+    """
+    The solver function registered as name, importing its module the first
+    time it is asked for.
+
+    >>> get_solver('bomb_baby')('4', '7')
+    '4'
+    >>> get_solver('gold_mining')
+    Traceback (most recent call last):
+    ...
+    KeyError: "unknown solver 'gold_mining'"
+    """
+    solver = loaded_solvers.get(name)
+
+    if solver is None:
+        if name not in SOLVERS:
+            raise KeyError('unknown solver ' + repr(name))
+
+        module_name, function_name = SOLVERS[name]
+        solver = getattr(importlib.import_module(module_name), function_name)
+        loaded_solvers[name] = solver
+
+    return solver
+
+
+def solve(name, *args, **kwargs):
+    """
+    >>> solve('fuel_injection_perfection', '15')
+    5
+    """
+    return get_solver(name)(*args, **kwargs)
+
+
+def json_result(result):
+    """
+    result in a form json can encode (array('i') and other sequences become lists)
+
+    >>> import array
+    >>> json_result(array.array('i', [1, 0]))
+    [1, 0]
+    """
+    if isinstance(result, (str, int, float, bool, type(None), dict, list)):
+        return result
+    return list(result)
+
+
+def main(argv=None):
+    # argparse costs about as much as starting the interpreter, so workers that only use the registry skip it
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Run a foobar solver on JSON arguments.')
+    parser.add_argument('solver', nargs='?', help='one of ' + ', '.join(SOLVERS))
+    parser.add_argument('arguments', nargs='*',
+                        help='JSON-encoded positional arguments, or - to read a JSON list of them from stdin')
+    parser.add_argument('--option', action='append', default=[], metavar='NAME=JSON',
+                        help='a JSON-encoded keyword argument (may be repeated)')
+    parser.add_argument('--list', action='store_true', help='list the registered solvers')
+    parser.add_argument('--cache', help='answer repeated inputs from (and store results in) this result cache file')
+    parser.add_argument('--stats', action='store_true',
+                        help='print the instrumentation of the call to stderr in Prometheus text format')
+    args = parser.parse_args(argv)
+
+    if args.list:
+        for name, (module_name, function_name) in SOLVERS.items():
+            print('{:<28}{}.{}'.format(name, module_name, function_name))
+        return 0
+
+    if args.solver not in SOLVERS:
+        parser.error('unknown solver {!r}; use --list to see them'.format(args.solver))
+
+    if args.arguments == ['-']:
+        solver_args = json.load(sys.stdin)
+    else:
+        solver_args = [json.loads(argument) for argument in args.arguments]
+
+    solver_kwargs = dict()
+    for option in args.option:
+        name, _, value = option.partition('=')
+        solver_kwargs[name] = json.loads(value)
+
+    solver = get_solver(args.solver)
+    if args.cache:
+        import functools
+        import result_cache
+
+        solver = functools.partial(result_cache.open_cache(args.cache).solve, args.solver)
+
+    if args.stats:
+        import instrumentation
+
+        result, stats = instrumentation.collect(solver, *solver_args, **solver_kwargs)
+        sys.stderr.write(stats.prometheus_text())
+    else:
+        result = solver(*solver_args, **solver_kwargs)
+
+    print(json.dumps(json_result(result)))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())